@@ -1,10 +1,13 @@
 import os
 import random
+import threading
 import time
+from concurrent.futures import Future
 from typing import Tuple
 
 # import onnxruntime as ort # Removed onnxruntime
-from openvino import Core  # Added OpenVINO Core
+from openvino import AsyncInferQueue, Core, Layout, Tensor, Type  # Added OpenVINO Core
+from openvino.preprocess import PrePostProcessor, ColorFormat
 import cv2
 import numpy as np
 
@@ -13,6 +16,23 @@ from ok import Logger, Box, sort_boxes
 logger = Logger.get_logger(__name__)
 
 
+class YoloResult:
+
+    def __init__(self, boxes, frame_time, threshold, label):
+        self.boxes = boxes
+        self.frame_time = frame_time
+        self.threshold = threshold
+        self.label = label
+
+    @property
+    def age(self):
+        """Seconds since the frame this result was detected on was submitted."""
+        return time.time() - self.frame_time
+
+    def __repr__(self):
+        return f'YoloResult({self.boxes}, age={self.age:.3f})'
+
+
 class OpenVinoYolo8Detect:  # Renamed class
 
     def __init__(self, weights='echo.onnx', model_h=640, model_w=640, iou_thres=0.45):
@@ -35,167 +55,230 @@ class OpenVinoYolo8Detect:  # Renamed class
             logger.info(f"Compiling OpenVINO model for {device}...")
             # Read and compile the ONNX model directly
             model = self.core.read_model(model=self.openfile_name_model)
+            _, _, self.input_height, self.input_width = model.input(0).shape
+            # fold BGR->RGB, u8->f32, /255 and NHWC->NCHW into the compiled graph,
+            # so a frame only needs to be letterboxed into a reused u8 buffer
+            ppp = PrePostProcessor(model)
+            ppp.input().tensor().set_element_type(Type.u8).set_layout(Layout('NHWC')).set_color_format(
+                ColorFormat.BGR)
+            ppp.input().model().set_layout(Layout('NCHW'))
+            ppp.input().preprocess().convert_element_type(Type.f32).convert_color(ColorFormat.RGB).scale(255.0)
+            model = ppp.build()
             self.compiled_model = self.core.compile_model(model=model, device_name=device,
             config={"PERFORMANCE_HINT": "LATENCY"},)
             # Get input/output names (usually one input, one output for YOLOv5)
             self.input_layer = self.compiled_model.input(0)
             self.output_layer = self.compiled_model.output(0)
-            self.input_width = self.input_layer.shape[2]
-            self.input_height = self.input_layer.shape[3]
+            # letterbox canvas, shared with the infer request input tensor
+            self.input_buffer = np.full((1, self.input_height, self.input_width, 3), 114, dtype=np.uint8)
+            self.infer_request = self.compiled_model.create_infer_request()
+            self.infer_request.set_input_tensor(Tensor(self.input_buffer, shared_memory=True))
+            self._letterbox_cache = {}
+            self._buffer_shapes = {}
+            self._infer_lock = threading.Lock()
+            self.async_jobs = 2
+            self.async_queue = None
+            self.async_buffers = None
+            self.latest_result = None
+            self._async_lock = threading.Lock()
             logger.info(f"OpenVINO model compiled successfully for {self.compiled_model} {self.input_width}x{self.input_height}.")
         except Exception as e:
             logger.error(f"Error initializing OpenVINO: {e}")
             raise RuntimeError("Could not initialize OpenVINO model") from e
         # --- End OpenVINO Initialization ---
 
-    def letterbox(self, img: np.ndarray, new_shape: Tuple[int, int] = (640, 640)) -> Tuple[np.ndarray, Tuple[int, int]]:
+    def letterbox_geometry(self, shape: Tuple[int, int]) -> Tuple[Tuple[int, int], int, int]:
         """
-        Resize and reshape images while maintaining aspect ratio by adding padding.
+        Compute the resize target and padding that keep the aspect ratio, cached per frame shape.
 
         Args:
-            img (np.ndarray): Input image to be resized.
-            new_shape (Tuple[int, int]): Target shape (height, width) for the image.
+            shape (Tuple[int, int]): Shape (height, width) of the input image.
 
         Returns:
-            (np.ndarray): Resized and padded image.
-            (Tuple[int, int]): Padding values (top, left) applied to the image.
+            (Tuple[int, int]): Resized (width, height) of the image inside the canvas.
+            (int): Top padding.
+            (int): Left padding.
         """
-        shape = img.shape[:2]  # current shape [height, width]
-
-        # Scale ratio (new / old)
-        r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
-
-        # Compute padding
-        new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
-        dw, dh = (new_shape[1] - new_unpad[0]) / 2, (new_shape[0] - new_unpad[1]) / 2  # wh padding
-
-        if shape[::-1] != new_unpad:  # resize
-            img = cv2.resize(img, new_unpad, interpolation=cv2.INTER_LINEAR)
-        top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
-        left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
-        img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
-
-        return img, (top, left)
-
-    def _preprocess(self, img):
-        """图像预处理（保持宽高比的缩放填充） - unchanged"""
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-        img, pad = self.letterbox(img, (self.input_width, self.input_height))
-
-        # Normalize the image data by dividing it by 255.0
-        image_data = np.array(img) / 255.0
-
-        # Transpose the image to have the channel dimension as the first dimension
-        image_data = np.transpose(image_data, (2, 0, 1))  # Channel first
-
-        # Expand the dimensions of the image data to match the expected input shape
-        image_data = np.expand_dims(image_data, axis=0).astype(np.float32)
-
-        # Return the preprocessed image data
-        return image_data, pad
+        geometry = self._letterbox_cache.get(shape)
+        if geometry is None:
+            r = min(self.input_height / shape[0], self.input_width / shape[1])
+            new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+            dw, dh = (self.input_width - new_unpad[0]) / 2, (self.input_height - new_unpad[1]) / 2
+            geometry = new_unpad, int(round(dh - 0.1)), int(round(dw - 0.1))
+            self._letterbox_cache[shape] = geometry
+        return geometry
+
+    def _preprocess(self, img, buffer=None):
+        """
+        Letterbox the BGR frame into the preallocated u8 NHWC input buffer, no per-frame allocation.
 
+        The resize writes straight into the unpadded region of the buffer, the padding is only
+        refilled when the frame shape changes. Color swap and normalization run inside OpenVINO.
 
-    def _postprocess(self,  outputs, padding, orig_shape, confidence_threshold, label):
+        Returns:
+            (np.ndarray): The filled (1, H, W, 3) input buffer.
+            (Tuple[int, int]): Padding values (top, left) applied to the image.
         """
-        Perform post-processing on the model's output to extract and visualize detections.
+        if buffer is None:
+            buffer = self.input_buffer
+        shape = img.shape[:2]
+        (new_w, new_h), top, left = self.letterbox_geometry(shape)
+        canvas = buffer[0]
+        if self._buffer_shapes.get(id(buffer)) != shape:
+            canvas.fill(114)
+            self._buffer_shapes[id(buffer)] = shape
+        roi = canvas[top:top + new_h, left:left + new_w]
+        if shape == (new_h, new_w):
+            np.copyto(roi, img)
+        else:
+            cv2.resize(img, (new_w, new_h), dst=roi, interpolation=cv2.INTER_LINEAR)
+        return buffer, (top, left)
+
+    def _postprocess(self, outputs, padding, orig_shape, confidence_threshold, label, batched_nms=False):
+        """
+        Decode the raw YOLOv8 output into boxes, fully vectorized.
 
-        This method processes the raw model output to extract bounding boxes, scores, and class IDs.
-        It applies non-maximum suppression to filter overlapping detections and draws the results on the input image.
+        The (1, 4 + classes, anchors) output is thresholded, class filtered and converted
+        to pixel boxes as whole-array operations, only the few surviving rows reach NMS.
 
         Args:
-            input_image (np.ndarray): The input image.
-            output (List[np.ndarray]): The output arrays from the model.
-            pad (Tuple[int, int]): Padding values (top, left) used during letterboxing.
+            outputs (np.ndarray): The raw output tensor of the model.
+            padding (Tuple[int, int]): Padding values (top, left) used during letterboxing.
+            orig_shape (Tuple[int, int]): Shape (height, width) of the original image.
+            confidence_threshold (float): Minimum class score to keep a detection.
+            label (int): Class id to keep, -1 keeps all classes.
+            batched_nms (bool): Run NMS per class instead of across all classes.
 
         Returns:
-            (np.ndarray): The input image with detections drawn on it.
+            (List[Box]): The detections that survived NMS.
         """
-        # Transpose and squeeze the output to match the expected shape
-        outputs = np.transpose(np.squeeze(outputs[0]))
-
-        # Get the number of rows in the outputs array
-        rows = outputs.shape[0]
+        # (4 + classes, anchors) -> (anchors, 4 + classes), a view, no copy
+        predictions = np.squeeze(outputs[0]).T
+        class_scores = predictions[:, 4:]
 
-        # Lists to store the bounding boxes, scores, and class IDs of the detections
-        boxes = []
-        scores = []
-        class_ids = []
-
-        # Calculate the scaling factors for the bounding box coordinates
-        gain = min(orig_shape[0] / orig_shape[0], self.input_width / orig_shape[1])
-
-        outputs[:, 0] -= padding[1]
-        outputs[:, 1] -= padding[0]
-
-        # Iterate over each row in the outputs array
-        for i in range(rows):
-            # Extract the class scores from the current row
-            classes_scores = outputs[i][4:]
-
-            # Find the maximum score among the class scores
-            max_score = np.amax(classes_scores)
-            class_id = np.argmax(classes_scores)
-            # If the maximum score is above the confidence threshold
-            if max_score >= confidence_threshold and (label==-1 or label==class_id):
-                # Get the class ID with the highest score
+        class_ids = np.argmax(class_scores, axis=1)
+        max_scores = class_scores[np.arange(class_scores.shape[0]), class_ids]
 
+        keep = max_scores >= confidence_threshold
+        if label != -1:
+            keep &= class_ids == label
+        if not keep.any():
+            return []
 
-                # Extract the bounding box coordinates from the current row
-                x, y, w, h = outputs[i][0], outputs[i][1], outputs[i][2], outputs[i][3]
+        # the letterbox ratio, also correct for crops narrower or taller than the model input
+        gain = min(self.input_height / orig_shape[0], self.input_width / orig_shape[1])
 
-                # Calculate the scaled coordinates of the bounding box
-                left = int((x - w / 2) / gain)
-                top = int((y - h / 2) / gain)
-                width = int(w / gain)
-                height = int(h / gain)
+        xywh = predictions[keep, :4]
+        class_ids = class_ids[keep]
+        scores = max_scores[keep]
 
-                # Add the class ID, score, and box coordinates to the respective lists
-                class_ids.append(class_id)
-                scores.append(max_score)
-                boxes.append([left, top, width, height])
+        x = xywh[:, 0] - padding[1]
+        y = xywh[:, 1] - padding[0]
+        w = xywh[:, 2]
+        h = xywh[:, 3]
+        # astype truncates toward zero, same as int()
+        boxes = np.stack(((x - w / 2) / gain, (y - h / 2) / gain, w / gain, h / gain), axis=1).astype(np.int32)
 
-        # Apply non-maximum suppression to filter out overlapping bounding boxes
-        indices = cv2.dnn.NMSBoxes(boxes, scores, confidence_threshold, self.iou_threshold)
+        if batched_nms:
+            indices = cv2.dnn.NMSBoxesBatched(boxes.tolist(), scores.tolist(), class_ids.tolist(),
+                                              confidence_threshold, self.iou_threshold)
+        else:
+            indices = cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), confidence_threshold, self.iou_threshold)
 
-        # Iterate over the selected indices after non-maximum suppression
         results = []
         for i in indices:
-            # Get the box, score, and class ID corresponding to the index
-            box = boxes[i]
-            box_obj = Box(box[0], box[1], box[2], box[3])  # Use Box class if available
+            left, top, width, height = boxes[i].tolist()
+            box_obj = Box(left, top, width, height)
             box_obj.name = self.dic_labels.get(int(class_ids[i]), 'unknown')
             box_obj.confidence = scores[i]
             results.append(box_obj)
-            # Draw the detection on the input image
-            # self.draw_detections(input_image, box, score, class_id)
         return results
 
     # 推理
-    def detect(self, image, threshold=0.5, label=-1):
+    def detect(self, image, threshold=0.5, label=-1, batched_nms=False, box=None):
         '''
-        预测
+        预测, box: 只在该区域内检测, 返回的坐标仍是原图坐标
         '''
         try:
+            if box is not None:
+                image = box.crop_frame(image)
             h, w = image.shape[:2]
-            img_data, pad = self._preprocess(image)
-            # input_tensor = np.expand_dims(img_data, axis=0)  # Add batch dimension
-
-            # --- OpenVINO Inference ---
-            # Input is a dictionary {input_layer_name: data}
-            # Output is a dictionary {output_layer_name: data}
-            results = self.compiled_model({self.input_layer: img_data})
-            # Extract the output tensor using the output layer obtained during init
-            outputs = results[self.output_layer]
-            # --- End OpenVINO Inference ---
-            boxes = self._postprocess(outputs, pad, (h, w), threshold, label)
-
-            return sort_boxes(boxes)
+            with self._infer_lock:
+                # the input buffer is bound to the infer request, filling it is all the input setup needed
+                _, pad = self._preprocess(image)
+                self.infer_request.infer()
+                # a view on the request's output memory, decoded before the next inference
+                outputs = self.infer_request.get_output_tensor().data
+                boxes = self._postprocess(outputs, pad, (h, w), threshold, label, batched_nms=batched_nms)
+
+            return sort_boxes(offset_boxes(boxes, box))
         except Exception as e:
             logger.error(f'OpenVINO yolo detect error:', e)  # Added exc_info
             return []
 
 
+    def _init_async_queue(self):
+        self.async_queue = AsyncInferQueue(self.compiled_model, self.async_jobs)
+        self.async_buffers = []
+        for job_id in range(self.async_jobs):
+            buffer = np.full_like(self.input_buffer, 114)
+            self.async_queue[job_id].set_input_tensor(Tensor(buffer, shared_memory=True))
+            self.async_buffers.append(buffer)
+        self.async_queue.set_callback(self._on_async_done)
+        logger.info(f'OpenVINO async infer queue created with {self.async_jobs} jobs')
+
+    def detect_async(self, image, threshold=0.5, label=-1, batched_nms=False, box=None):
+        """
+        Submit a frame to the infer request pool and return immediately.
+
+        The frame is letterboxed into the idle request's own buffer before returning, so the caller
+        may reuse the frame right away. Blocks only when every request of the pool is still busy.
+
+        Returns:
+            (Future): Resolves to a YoloResult once the inference and decoding are done.
+        """
+        future = Future()
+        frame_time = time.time()
+        try:
+            if box is not None:
+                image = box.crop_frame(image)
+            with self._async_lock:
+                if self.async_queue is None:
+                    self._init_async_queue()
+                job_id = self.async_queue.get_idle_request_id()
+                _, pad = self._preprocess(image, buffer=self.async_buffers[job_id])
+                self.async_queue.start_async(
+                    userdata=(future, pad, image.shape[:2], threshold, label, batched_nms, frame_time, box))
+        except Exception as e:
+            logger.error(f'OpenVINO yolo detect_async error:', e)
+            future.set_result(YoloResult([], frame_time, threshold, label))
+        return future
+
+    def _on_async_done(self, request, userdata):
+        future, pad, shape, threshold, label, batched_nms, frame_time, box = userdata
+        try:
+            outputs = request.get_output_tensor().data
+            boxes = self._postprocess(outputs, pad, shape, threshold, label, batched_nms=batched_nms)
+            boxes = sort_boxes(offset_boxes(boxes, box))
+            result = YoloResult(boxes, frame_time, threshold, label)
+            latest = self.latest_result
+            if latest is None or latest.frame_time < frame_time:
+                self.latest_result = result
+            future.set_result(result)
+        except Exception as e:
+            logger.error(f'OpenVINO yolo async callback error:', e)
+            future.set_result(YoloResult([], frame_time, threshold, label))
+
+
+def offset_boxes(boxes, box):
+    # map boxes detected on box.crop_frame(image) back to image coordinates
+    if box is not None:
+        for b in boxes:
+            b.x += box.x
+            b.y += box.y
+    return boxes
+
+
 # --- Main execution part needs to be updated to use the new class ---
 if __name__ == '__main__':
     # Ensure ok module and Box class are available, or provide stubs
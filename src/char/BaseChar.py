@@ -3,7 +3,7 @@ from enum import IntEnum, StrEnum
 from typing import Any
 
 from ok import Config, Logger
-from src import text_white_color
+from src.combat.HudSnapshot import hud_skills
 
 
 class Priority(IntEnum):
@@ -115,6 +115,8 @@ class BaseChar:
         self.switch_next_char()
 
     def has_cd(self, box_name):
+        if box_name in hud_skills:
+            return self.task.hud_snapshot().has_cd(box_name)
         return self.task.has_cd(box_name)
 
     def is_available(self, percent, box_name):
@@ -432,8 +434,8 @@ class BaseChar:
         return self.current_con
 
     def is_forte_full(self):
-        box = self.task.box_of_screen_scaled(3840, 2160, 2251, 1993, 2311, 2016, name='forte_full', hcenter=True)
-        white_percent = self.task.calculate_color_percentage(forte_white_color, box)
+        box = self.task.forte_box().copy()
+        white_percent = self.task.hud_snapshot().forte
         # num_labels, stats = get_connected_area_by_color(box.crop_frame(self.task.frame), forte_white_color,
         #                                                 connectivity=8)
         # total_area = 0
@@ -487,15 +489,13 @@ class BaseChar:
         self.logger.debug('heavy attack end')
 
     def current_resonance(self):
-        return self.task.calculate_color_percentage(text_white_color,
-                                                    self.task.get_box_by_name('box_resonance'))
+        return self.task.hud_snapshot().resonance
 
     def current_echo(self):
-        return self.task.calculate_color_percentage(text_white_color,
-                                                    self.task.get_box_by_name('box_echo'))
+        return self.task.hud_snapshot().echo
 
     def current_liberation(self):
-        return self.task.calculate_color_percentage(text_white_color, self.task.get_box_by_name('box_liberation'))
+        return self.task.hud_snapshot().liberation
 
     def flying(self):
         return self.current_resonance() == 0
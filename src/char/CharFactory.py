@@ -72,6 +72,7 @@ def get_char_by_pos(task, box, index, old_char):
             return old_char
 
     if not char:
+        # the slot changed, match every character template against it in one pass
         char = task.find_best_match_in_box(box, char_names, threshold=0.6)
         if char:
             info = char_dict.get(char.name)
@@ -5,6 +5,7 @@ from ok import find_boxes_by_name, Logger
 from ok import find_color_rectangles, get_mask_in_color_range, is_pure_black
 from src import text_white_color
 from src.task.BaseWWTask import BaseWWTask
+from src.util.Profiler import profiled, profiler
 
 logger = Logger.get_logger(__name__)
 
@@ -83,7 +84,7 @@ class CombatCheck(BaseWWTask):
 
         if self.has_count_down:
             if count_down < 0.03:
-                numbers = self.ocr(box=count_down_area, match=count_down_re)
+                numbers = self.ocr_digits('count_down', count_down_area, count_down_re)
                 if self.debug:
                     self.screenshot(f'count_down disappeared {count_down:.2f}%')
                 logger.info(f'count_down disappeared {numbers} {count_down:.2f}%')
@@ -96,7 +97,7 @@ class CombatCheck(BaseWWTask):
                 return True
         else:
             if count_down > 0.03:
-                numbers = self.ocr(box=count_down_area, match=count_down_re)
+                numbers = self.ocr_digits('count_down', count_down_area, count_down_re)
                 if numbers:
                     self.has_count_down = True
                 logger.info(f'set count_down to {self.has_count_down}  {numbers} {count_down:.2f}%')
@@ -135,13 +136,17 @@ class CombatCheck(BaseWWTask):
             if in_combat:
                 if not self.target_enemy(wait=True):
                     return False
+                self.log_time(start, 'enter_combat')
                 logger.info(
                     f'enter combat cost {(time.time() - start):2f} boss_lv_template:{self.boss_lv_template is not None} boss_health_box:{self.boss_health_box} has_count_down:{self.has_count_down}')
                 self._in_combat = True
                 return True
 
     def log_time(self, start, name):
-        logger.debug(f'check cost {name} {time.time() - start}')
+        cost = time.time() - start
+        if profiler.enabled:
+            profiler.record(type(self).__name__, name, cost)
+        logger.debug(f'check cost {name} {cost}')
         return True
 
     def ocr_lv_text(self):
@@ -164,18 +169,9 @@ class CombatCheck(BaseWWTask):
             )
         return True
 
+    @profiled
     def has_target(self):
-        if self.has_long_actionbar_chars():
-            outer_box = 'box_target_enemy_long'
-            inner_box = 'box_target_enemy_long_inner'
-        else:
-            outer_box = 'box_target_enemy'
-            inner_box = 'box_target_enemy_inner'
-        aim_percent = self.calculate_color_percentage(aim_color, self.get_box_by_name(outer_box))
-        aim_inner_percent = self.calculate_color_percentage(aim_color, self.get_box_by_name(inner_box))
-        # logger.debug(f'box_target_enemy yellow percent {aim_percent} {aim_inner_percent}')
-        if aim_percent - aim_inner_percent > 0.02:
-            return True
+        return self.target_aimed(self.has_long_actionbar_chars())
 
     def has_long_actionbar_chars(self):
         if not self._in_combat:
@@ -196,6 +192,7 @@ class CombatCheck(BaseWWTask):
                 return self.wait_until(self.has_target, time_out=self.target_enemy_time_out,
                                        pre_action=lambda: self.middle_click(interval=0.2))
 
+    @profiled
     def check_health_bar(self):
         if self._in_combat:
             min_height = self.height_of_screen(12 / 2160)
@@ -299,9 +296,3 @@ boss_health_color = {
     'g': (30, 185),  # Green range
     'b': (4, 75)  # Blue range
 }
-
-aim_color = {
-    'r': (150, 190),  # Red range
-    'g': (148, 172),  # Green range
-    'b': (22, 62)  # Blue range
-}
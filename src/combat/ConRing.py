@@ -0,0 +1,122 @@
+import cv2
+import numpy as np
+
+con_colors = [
+    {
+        'r': (205, 235),
+        'g': (190, 222),  # for yellow spectro
+        'b': (90, 130)
+    },
+    {
+        'r': (150, 190),  # Red range
+        'g': (95, 140),  # Green range for purple electric
+        'b': (210, 249)  # Blue range
+    },
+    {
+        'r': (200, 230),  # Red range
+        'g': (100, 130),  # Green range    for red fire
+        'b': (75, 105)  # Blue range
+    },
+    {
+        'r': (60, 95),  # Red range
+        'g': (150, 180),  # Green range    for blue ice
+        'b': (210, 245)  # Blue range
+    },
+    {
+        'r': (70, 110),  # Red range
+        'g': (215, 250),  # Green range    for green wind
+        'b': (155, 190)  # Blue range
+    },
+    {
+        'r': (190, 220),  # Red range
+        'g': (65, 105),  # Green range    for havoc
+        'b': (145, 175)  # Blue range
+    }
+]
+
+
+class ConRingAnalyzer:
+    """
+    Finds the concerto ring of every element color in one pass: per channel 256 entry LUTs give each
+    pixel a bit mask of the colors it is in range of, components of the any color mask too small
+    to hold a ring are rejected by their stats, and contours only run on the ROI of what is left.
+    """
+
+    def __init__(self, colors=None):
+        self.colors = colors or con_colors
+        self.bounds = [(np.array([c['b'][0], c['g'][0], c['r'][0]], dtype=np.uint8),
+                        np.array([c['b'][1], c['g'][1], c['r'][1]], dtype=np.uint8)) for c in self.colors]
+        values = np.arange(256)
+        self.luts = []
+        for channel in 'bgr':
+            lut = np.zeros(256, dtype=np.uint8)
+            for i, color in enumerate(self.colors):
+                low, high = color[channel]
+                lut[(values >= low) & (values <= high)] |= 1 << i
+            self.luts.append(lut)
+
+    def color_bits(self, image):
+        b, g, r = cv2.split(image)
+        bits = cv2.LUT(b, self.luts[0])
+        cv2.bitwise_and(bits, cv2.LUT(g, self.luts[1]), dst=bits)
+        cv2.bitwise_and(bits, cv2.LUT(r, self.luts[2]), dst=bits)
+        return bits
+
+    def analyze(self, image, min_area, color_index=-1):
+        """
+        Args:
+            image (np.ndarray): BGR crop of the con ring.
+            min_area (float): Minimum bounding box area of a ring component.
+            color_index (int): Only test this color, -1 for all of them.
+
+        Returns:
+            (dict): color index -> (area, is_full, ring_count) for the colors with a ring sized component.
+        """
+        if color_index != -1:
+            mask = cv2.inRange(image, *self.bounds[color_index])
+            result = ring_components(mask, min_area)
+            return {color_index: result} if result[2] else {}
+        bits = self.color_bits(image)
+        num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(bits, connectivity=8)
+        results = {}
+        for label in np.nonzero(stats[1:, cv2.CC_STAT_WIDTH] * stats[1:, cv2.CC_STAT_HEIGHT] >= min_area)[0] + 1:
+            x, y, w, h = stats[label, :4]
+            roi_bits = np.where(labels[y:y + h, x:x + w] == label, bits[y:y + h, x:x + w], 0).astype(np.uint8)
+            present = np.bitwise_or.reduce(roi_bits, axis=None)
+            for i in range(len(self.colors)):
+                if not present & (1 << i):
+                    continue
+                mask = cv2.compare(cv2.bitwise_and(roi_bits, 1 << i), 0, cv2.CMP_GT)
+                area, is_full, count = ring_components(mask, min_area)
+                if count:
+                    last_area, last_full, last_count = results.get(i, (0, False, 0))
+                    results[i] = (area, is_full or last_full, count + last_count)
+        return results
+
+
+def ring_components(mask, min_area):
+    """
+    Returns:
+        (int, bool, int): area of the last ring sized component, if any of them is a full ring and their count.
+    """
+    num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    candidates = np.nonzero(stats[1:, cv2.CC_STAT_WIDTH] * stats[1:, cv2.CC_STAT_HEIGHT] >= min_area)[0] + 1
+    is_full = False
+    area = 0
+    for label in candidates:
+        x, y, w, h, area = stats[label, :5]
+        component = np.where(labels[y:y + h, x:x + w] == label, 255, 0).astype(np.uint8)
+        if is_full_ring(cv2.copyMakeBorder(component, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)):
+            is_full = True
+    return int(area), is_full, len(candidates)
+
+
+def is_full_ring(component_mask):
+    contours, _ = cv2.findContours(component_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if len(contours) != 1:
+        return False
+    contour = contours[0]
+    # Approximate the contour with polygons, a closed ring is convex with a reasonable number of vertices.
+    epsilon = 0.05 * cv2.arcLength(contour, True)
+    approx = cv2.approxPolyDP(contour, epsilon, True)
+    return cv2.isContourConvex(approx) and len(approx) >= 4
@@ -0,0 +1,70 @@
+from typing import NamedTuple
+
+import numpy as np
+
+
+class CooldownResult(NamedTuple):
+    """
+    Components of the dot color in a skill box: the decimal dot, the digits of the countdown and the
+    components touching the box border, any of them means it is not a countdown.
+    """
+    has_dot: bool
+    number_count: int
+    invalid: int
+
+    @property
+    def has_cd(self):
+        return not self.invalid and self.has_dot and 2 <= self.number_count <= 3
+
+
+class CooldownThresholds(NamedTuple):
+    dot_min_area: float
+    dot_max_area: float
+    number_min_height: float
+    number_max_height: float
+    number_min_width: float
+    number_max_width: float
+
+
+class CooldownClassifier:
+    """
+    Classifies the connected component stats of a skill box with numpy masks, the size thresholds
+    only depend on the resolution and are computed once per resolution.
+    """
+
+    def __init__(self):
+        self.thresholds = {}
+
+    def thresholds_of(self, frame_width, frame_height, screen_height):
+        key = frame_width, frame_height, screen_height
+        thresholds = self.thresholds.get(key)
+        if thresholds is None:
+            frame_area = frame_width * frame_height
+            thresholds = CooldownThresholds(16 / 3840 / 2160 * frame_area, 90 / 3840 / 2160 * frame_area,
+                                            25 / 2160 * screen_height, 45 / 2160 * screen_height,
+                                            5 / 2160 * screen_height, 35 / 2160 * screen_height)
+            self.thresholds[key] = thresholds
+        return thresholds
+
+    def classify(self, stats, box_width, box_height, thresholds):
+        """
+        Args:
+            stats (np.ndarray): Stats from connectedComponentsWithStats, background included.
+            box_width (int): Width of the skill box.
+            box_height (int): Height of the skill box.
+            thresholds (CooldownThresholds): From thresholds_of for the current resolution.
+
+        Returns:
+            CooldownResult: The dot, digit and border touching component counts.
+        """
+        stats = stats[1:]
+        left, top, width, height, area = (stats[:, i] for i in range(5))
+        inside = (left > 0) & (top > 0) & (left + width < box_width) & (top + height < box_height)
+        invalid = int(np.count_nonzero(~inside))
+        if invalid:
+            return CooldownResult(False, 0, invalid)
+        dot = ((thresholds.dot_min_area <= area) & (area <= thresholds.dot_max_area)
+               & (np.abs(width - height) < 0.3 * (width + height)) & (top > 0.6 * box_height))
+        number = (~dot & (thresholds.number_min_height <= height) & (height <= thresholds.number_max_height)
+                  & (thresholds.number_min_width <= width) & (width <= thresholds.number_max_width))
+        return CooldownResult(bool(dot.any()), int(np.count_nonzero(number)), 0)
@@ -0,0 +1,48 @@
+hud_skills = ('resonance', 'echo', 'liberation')
+
+
+class HudSnapshot:
+    """
+    The skill hud of one frame: white text percentage and cooldown of the skill buttons, forte white
+    percentage and the con rings, as color index -> (area, is full, ring count). Each field is probed
+    at most once, only when it is read, by probe(field, *args), read it only while its frame is current.
+    """
+
+    def __init__(self, frame, probe):
+        self.frame = frame
+        self.probe = probe
+        self.values = {}
+
+    def get(self, *field):
+        if field not in self.values:
+            self.values[field] = self.probe(*field)
+        return self.values[field]
+
+    def percentage(self, name):
+        return self.get('percentage', name)
+
+    def has_cd(self, name):
+        return self.get('has_cd', name)
+
+    @property
+    def resonance(self):
+        return self.percentage('resonance')
+
+    @property
+    def echo(self):
+        return self.percentage('echo')
+
+    @property
+    def liberation(self):
+        return self.percentage('liberation')
+
+    @property
+    def forte(self):
+        return self.get('forte')
+
+    def con_rings_of(self, color_index=-1):
+        all_rings = self.values.get(('con_rings', -1))
+        if all_rings is not None:
+            # all colors were analyzed already, no need to look at one again
+            return {i: ring for i, ring in all_rings.items() if color_index == -1 or i == color_index}
+        return dict(self.get('con_rings', color_index))
@@ -6,6 +6,7 @@ from PySide6.QtCore import Signal, QObject
 
 from ok import Config, Logger, get_path_relative_to_exe
 from src.OpenVinoYolo8Detect import OpenVinoYolo8Detect
+from src.util.Profiler import profiled
 
 logger = Logger.get_logger(__name__)
 
@@ -24,8 +25,15 @@ class Globals(QObject):
             self._yolo_model =  OpenVinoYolo8Detect(weights=get_path_relative_to_exe(os.path.join("assets", "yolo", "echo.onnx")))
         return self._yolo_model
 
-    def yolo_detect(self, image, threshold=0.6, label=-1):
-        return self.yolo_model.detect(image, threshold=threshold, label=label)
+    @profiled
+    def yolo_detect(self, image, threshold=0.6, label=-1, box=None):
+        return self.yolo_model.detect(image, threshold=threshold, label=label, box=box)
+
+    def yolo_detect_async(self, image, threshold=0.6, label=-1, box=None):
+        return self.yolo_model.detect_async(image, threshold=threshold, label=label, box=box)
+
+    def yolo_latest_result(self):
+        return self.yolo_model.latest_result if self._yolo_model is not None else None
 
 
 
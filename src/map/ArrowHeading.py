@@ -0,0 +1,76 @@
+import math
+
+import cv2
+import numpy as np
+
+# yellow body of the minimap arrow, HSV with opencv's 0-180 hue
+arrow_lower = np.array([15, 90, 150], dtype=np.uint8)
+arrow_upper = np.array([40, 255, 255], dtype=np.uint8)
+
+
+def arrow_mask(image, min_area=20):
+    """
+    Segments the arrow by color and keeps the connected component closest to the image center,
+    with its inner (white) holes filled.
+
+    Returns:
+        (np.ndarray): uint8 mask, 255 on the arrow, or None if no arrow colored area is found.
+    """
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, arrow_lower, arrow_upper)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    h, w = mask.shape[:2]
+    best = None
+    best_distance = None
+    for contour in contours:
+        if cv2.contourArea(contour) < min_area:
+            continue
+        x, y, cw, ch = cv2.boundingRect(contour)
+        distance = (x + cw / 2 - w / 2) ** 2 + (y + ch / 2 - h / 2) ** 2
+        if best is None or distance < best_distance:
+            best = contour
+            best_distance = distance
+    if best is None:
+        return None
+    mask[:] = 0
+    cv2.drawContours(mask, [best], -1, 255, -1)
+    return mask
+
+
+def estimate_heading(image, min_area=20):
+    """
+    Closed form heading of the chevron shaped minimap arrow.
+
+    The notch at the back of the arrow pulls the centroid of the shape forward from the centroid of its
+    convex hull, which gives the rough direction. The tip is the vertex of the enclosing triangle most
+    aligned with it, and the heading is the vector from the middle of the two wing vertices to the tip.
+
+    Returns:
+        (int, float): Angle in degrees clockwise from east (same as the template search) and the notch
+            offset relative to the arrow size, use it as a confidence. None if no arrow is found.
+    """
+    mask = arrow_mask(image, min_area=min_area)
+    if mask is None:
+        return None
+    moments = cv2.moments(mask, binaryImage=True)
+    if moments['m00'] == 0:
+        return None
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    hull = cv2.convexHull(contours[0])
+    hull_moments = cv2.moments(hull)
+    if hull_moments['m00'] == 0:
+        return None
+    center = np.array([moments['m10'] / moments['m00'], moments['m01'] / moments['m00']])
+    hull_center = np.array([hull_moments['m10'] / hull_moments['m00'], hull_moments['m01'] / hull_moments['m00']])
+    rough = center - hull_center
+    _, triangle = cv2.minEnclosingTriangle(hull.astype(np.float32))
+    vertices = triangle.reshape(3, 2)
+    tip_index = int(np.argmax((vertices - hull_center) @ rough))
+    tip = vertices[tip_index]
+    base = np.delete(vertices, tip_index, axis=0).mean(axis=0)
+    dx, dy = tip - base
+    degree = math.degrees(math.atan2(dy, dx))
+    if degree < 0:
+        degree += 360
+    size = math.sqrt(hull_moments['m00'])
+    return int(round(degree)) % 360, float(np.linalg.norm(rough) / size)
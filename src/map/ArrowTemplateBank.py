@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+
+_banks = {}
+
+
+class ArrowTemplateBank:
+    """
+    All 360 rotations of the minimap arrow template, built once per template (the feature
+    templates are rescaled per resolution, so once per resolution).
+    """
+
+    def __init__(self, template, with_mask=False):
+        self.with_mask = with_mask
+        self.height, self.width = template.shape[:2]
+        center = (self.width // 2, self.height // 2)
+        self.templates = np.stack(
+            [cv2.warpAffine(template, cv2.getRotationMatrix2D(center, -angle, 1.0), (self.width, self.height))
+             for angle in range(360)])
+        self.masks = None
+        if with_mask:
+            self.masks = np.where(np.all(self.templates == 0, axis=3), 0, 255).astype(np.uint8)
+
+    def match(self, image, angle, method=cv2.TM_CCOEFF_NORMED):
+        angle %= 360
+        mask = self.masks[angle] if self.masks is not None else None
+        result = cv2.matchTemplate(image, self.templates[angle], method, mask=mask)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if not np.isfinite(max_val):
+            max_val = 0
+        return max_val, max_loc
+
+    def search(self, image, coarse_step=10, refine=5, candidates=2):
+        """
+        Coarse to fine heading search: match every coarse_step degrees, then every degree within
+        +-refine around the best coarse candidates. coarse_step=1, refine=0 is the exhaustive search.
+
+        Returns:
+            (int, float, Tuple[int, int]): Angle in degrees clockwise, confidence and the top left of the match.
+        """
+        coarse = [(self.match(image, angle), angle) for angle in range(0, 360, coarse_step)]
+        coarse.sort(key=lambda item: item[0][0], reverse=True)
+        best_angle = coarse[0][1]
+        best_conf, best_loc = coarse[0][0]
+        if refine > 0:
+            checked = {angle for _, angle in coarse}
+            for _, center in coarse[:candidates]:
+                for angle in range(center - refine, center + refine + 1):
+                    angle %= 360
+                    if angle in checked:
+                        continue
+                    checked.add(angle)
+                    conf, loc = self.match(image, angle)
+                    if conf > best_conf:
+                        best_angle, best_conf, best_loc = angle, conf, loc
+        return best_angle, best_conf, best_loc
+
+
+def get_arrow_bank(template, with_mask=False):
+    """
+    Returns the cached bank for this template object, building it on first use.
+    """
+    key = (id(template), with_mask)
+    cached = _banks.get(key)
+    # the cache keeps the template alive, so its id can not be reused by another one
+    if cached is None:
+        cached = template, ArrowTemplateBank(template, with_mask=with_mask)
+        _banks[key] = cached
+    return cached[1]
@@ -0,0 +1,142 @@
+import math
+
+import cv2
+import numpy as np
+
+
+class MinimapLocator:
+    """
+    Finds the minimap on the big map with a two level pyramid: a masked match at 1/4 scale over a
+    window around the center hint (the one PositionTracker predicts), then a full scale match in a few pixels
+    around the coarse hit. When the coarse match is weak or sits on the window border (the real peak may be
+    outside), the window is doubled until it covers the map.
+    """
+
+    def __init__(self, big_map, scale=0.25, margin=0.25, min_coarse_confidence=0.3, refine_pixels=None,
+                 use_gray_scale=True):
+        # masked matching cost grows with the channels, the map texture is matched well enough in gray
+        self.use_gray_scale = use_gray_scale
+        if use_gray_scale:
+            big_map = cv2.cvtColor(big_map, cv2.COLOR_BGR2GRAY)
+        self.big_map = big_map
+        self.scale = scale
+        self.small_map = cv2.resize(big_map, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        self.margin = margin
+        self.min_coarse_confidence = min_coarse_confidence
+        self.refine_pixels = refine_pixels or int(math.ceil(2 / scale))
+        self.widen_count = 0
+
+    def locate(self, minimap, mask=None, center=None, threshold=0.05):
+        """
+        Args:
+            minimap (np.ndarray): The BGR minimap crop, same scale as the big map.
+            mask (np.ndarray): uint8 mask of the minimap pixels to match.
+            center (tuple): Search around this center first, the whole map if None.
+
+        Returns:
+            (tuple): x, y, width, height, confidence of the match on the big map, or None.
+        """
+        h, w = minimap.shape[:2]
+        if self.use_gray_scale:
+            minimap = cv2.cvtColor(minimap, cv2.COLOR_BGR2GRAY)
+        small_template = cv2.resize(minimap, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        small_mask = None
+        if mask is not None:
+            small_mask = cv2.resize(mask, (small_template.shape[1], small_template.shape[0]),
+                                    interpolation=cv2.INTER_NEAREST)
+
+        map_h, map_w = self.big_map.shape[:2]
+        margin = max(w, h) * self.margin
+        coarse = None
+        while True:
+            if center is None:
+                window = (0, 0, map_w, map_h)
+            else:
+                window = clamp_window(center[0] - w / 2 - margin, center[1] - h / 2 - margin, w + 2 * margin,
+                                      h + 2 * margin, map_w, map_h)
+            small_window = scale_window(window, self.scale)
+            coarse = self._match(self.small_map, small_template, small_mask, small_window)
+            if window == (0, 0, map_w, map_h):
+                break
+            if coarse is not None and coarse[2] >= self.min_coarse_confidence and not on_border(
+                    coarse, small_window, small_template.shape, self.small_map.shape):
+                break
+            self.widen_count += 1
+            margin *= 2
+        if coarse is None:
+            return None
+
+        x = coarse[0] / self.scale
+        y = coarse[1] / self.scale
+        refine = self.refine_pixels
+        window = clamp_window(x - refine, y - refine, w + 2 * refine, h + 2 * refine, map_w, map_h)
+        fine = self._match(self.big_map, minimap, mask, window)
+        if fine is None or fine[2] < threshold:
+            return None
+        return fine[0], fine[1], w, h, fine[2]
+
+    @staticmethod
+    def _match(image, template, mask, window):
+        x, y, width, height = window
+        area = image[y:y + height, x:x + width]
+        th, tw = template.shape[:2]
+        if area.shape[0] < th or area.shape[1] < tw:
+            return None
+        result = cv2.matchTemplate(area, template, cv2.TM_CCOEFF_NORMED, mask=mask)
+        result[~np.isfinite(result)] = 0
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return x + max_loc[0], y + max_loc[1], max_val
+
+
+def on_border(found, window, template_shape, map_shape):
+    # a peak on an edge of the window, unless that edge is the map edge
+    x, y = found[0] - window[0], found[1] - window[1]
+    max_x = window[2] - template_shape[1]
+    max_y = window[3] - template_shape[0]
+    return ((x == 0 and window[0] > 0) or (y == 0 and window[1] > 0) or
+            (x == max_x and window[0] + window[2] < map_shape[1]) or
+            (y == max_y and window[1] + window[3] < map_shape[0]))
+
+
+def clamp_window(x, y, width, height, max_width, max_height):
+    x1 = max(0, int(x))
+    y1 = max(0, int(y))
+    x2 = min(max_width, int(math.ceil(x + width)))
+    y2 = min(max_height, int(math.ceil(y + height)))
+    return x1, y1, x2 - x1, y2 - y1
+
+
+def scale_window(window, scale):
+    x, y, width, height = window
+    return int(x * scale), int(y * scale), int(math.ceil(width * scale)), int(math.ceil(height * scale))
+
+
+def create_circle_mask_with_hole(image):
+    """
+    Creates a binary circular mask with a rectangular hole in the center.
+    The circle fills the mask dimensions, and the hole is 1/4 width and height.
+    Args:
+        shape (tuple): The (height, width) of the desired mask.
+    Returns:
+        numpy.ndarray: A uint8 NumPy array representing the mask
+                       (255 in the circle ring, 0 elsewhere and in the hole).
+    """
+    h, w = image.shape[:2]
+    mask = np.zeros((h, w), dtype=np.uint8)
+    center_x, center_y = w // 2, h // 2
+    radius = min(w, h) // 2
+    # 1. Draw the outer filled white circle
+    cv2.circle(mask, (center_x, center_y), radius, 255, -1)
+    # 2. Calculate rectangle dimensions and corners for the hole
+    rect_w = round(w / 4.4)
+    rect_h = round(h / 4.4)
+    # Calculate top-left corner centered
+    rect_x1 = center_x - rect_w // 2
+    rect_y1 = center_y - rect_h // 2
+    # Calculate bottom-right corner
+    rect_x2 = rect_x1 + rect_w
+    rect_y2 = rect_y1 + rect_h
+    # 3. Draw the inner filled black rectangle (the hole)
+    # Use color=0 and thickness=-1 to fill with black
+    cv2.rectangle(mask, (rect_x1, rect_y1), (rect_x2, rect_y2), 0, -1)
+    return mask
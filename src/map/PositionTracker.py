@@ -0,0 +1,91 @@
+import math
+
+
+class PositionTracker:
+    """
+    Constant velocity model of the player position on the big map, so the minimap does not have to
+    be located on every tick. The uncertainty is the recent prediction error plus a drift growing with
+    the time since the last match (a fraction of the speed per second, for turns and stops). The
+    predicted center is where MinimapLocator searches first.
+    """
+
+    def __init__(self, max_uncertainty, drift=0.5, min_drift=5, smoothing=0.5):
+        self.max_uncertainty = max_uncertainty
+        self.drift = drift
+        self.min_drift = min_drift
+        self.smoothing = smoothing
+        self.center = None
+        self.last_center = None
+        self.time = 0
+        self.velocity = (0, 0)
+        self.error = None
+        self.last_error = 0
+        self.located = 0
+        self.skipped = 0
+
+    def reset(self, last_center=None):
+        # the motion changed (combat, turn, stuck), start over from the next two matches
+        if last_center is not None:
+            self.last_center = last_center
+        self.center = None
+        self.velocity = (0, 0)
+        self.error = None
+
+    @property
+    def skip_rate(self):
+        total = self.located + self.skipped
+        return self.skipped / total if total else 0
+
+    def predict(self, now, heading=None):
+        if self.center is None:
+            return None
+        dt = now - self.time
+        vx, vy = self.velocity
+        if heading is not None:
+            speed = math.hypot(vx, vy)
+            vx = speed * math.cos(math.radians(heading))
+            vy = speed * math.sin(math.radians(heading))
+        return self.center[0] + vx * dt, self.center[1] + vy * dt
+
+    def hint(self, now, heading=None):
+        """
+        Where to search for the next match: the predicted center, after a reset the last located one.
+        """
+        predicted = self.predict(now, heading)
+        return self.last_center if predicted is None else predicted
+
+    def uncertainty(self, now):
+        if self.center is None or self.error is None:
+            return math.inf
+        speed = math.hypot(*self.velocity)
+        return self.error + max(speed * self.drift, self.min_drift) * (now - self.time)
+
+    def should_locate(self, now):
+        return self.uncertainty(now) > self.max_uncertainty
+
+    def update(self, center, now, heading=None):
+        """
+        Feeds a located center, returns the error of the prediction for it (0 for the first one).
+        """
+        predicted = self.predict(now, heading)
+        self.located += 1
+        self.last_center = center
+        if predicted is None:
+            self.center = center
+            self.time = now
+            return 0
+        self.last_error = math.hypot(center[0] - predicted[0], center[1] - predicted[1])
+        dt = now - self.time
+        if dt > 0:
+            measured = ((center[0] - self.center[0]) / dt, (center[1] - self.center[1]) / dt)
+            if self.error is None:
+                # the first velocity fits these two matches exactly
+                self.velocity = measured
+                self.error = 0
+            else:
+                self.velocity = tuple(self.smoothing * m + (1 - self.smoothing) * v
+                                      for m, v in zip(measured, self.velocity))
+                self.error = self.smoothing * self.last_error + (1 - self.smoothing) * self.error
+        self.center = center
+        self.time = now
+        return self.last_error
@@ -0,0 +1,126 @@
+import numpy as np
+
+
+def distance_matrix(points):
+    """
+    Pairwise center distances of boxes, computed once for the whole route.
+    """
+    centers = np.array([p.center() for p in points], dtype=np.float64).reshape(-1, 2)
+    diff = centers[:, None, :] - centers[None, :, :]
+    return np.hypot(diff[..., 0], diff[..., 1])
+
+
+def route_length(matrix, order):
+    order = np.asarray(order)
+    if len(order) < 2:
+        return 0.0
+    return float(matrix[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbor(matrix, start=0):
+    """
+    Greedy nearest neighbor route over the matrix indexes from start, stops when nothing left is reachable
+    (inf marks unreachable pairs).
+    """
+    n = len(matrix)
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    order = [start]
+    current = start
+    for _ in range(n - 1):
+        distances = np.where(visited, np.inf, matrix[current])
+        next_index = int(np.argmin(distances))
+        if not np.isfinite(distances[next_index]):
+            break
+        order.append(next_index)
+        visited[next_index] = True
+        current = next_index
+    return order
+
+
+def two_opt(matrix, order):
+    """
+    Reverses route segments while it shortens the open route, the first point stays fixed.
+    """
+    order = list(order)
+    n = len(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            route = np.array(order)
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:]
+            # reverse order[i..j], the last j has no next edge and only changes the a-b edge
+            delta = matrix[a, c] - matrix[a, b]
+            delta[:-1] += matrix[b, route[i + 2:]] - matrix[c[:-1], route[i + 2:]]
+            j = int(np.argmin(delta))
+            if delta[j] < -1e-6:
+                order[i:i + j + 2] = order[i:i + j + 2][::-1]
+                improved = True
+    return order
+
+
+def or_opt(matrix, order, max_segment=3):
+    """
+    Moves segments of up to max_segment points (as is or reversed) to a cheaper place in the route.
+    """
+    order = list(order)
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, max_segment + 1):
+            i = 1
+            while i + length <= len(order):
+                segment = order[i:i + length]
+                prev_point = order[i - 1]
+                next_point = order[i + length] if i + length < len(order) else None
+                removed = matrix[prev_point, segment[0]]
+                if next_point is not None:
+                    removed += matrix[segment[-1], next_point] - matrix[prev_point, next_point]
+                if not np.isfinite(removed):
+                    # prev and next are too far apart to drop the segment between them
+                    i += 1
+                    continue
+                rest = order[:i] + order[i + length:]
+                rest_array = np.array(rest)
+                best_delta = -1e-6
+                best = None
+                for candidate in (segment, segment[::-1]):
+                    # insert after rest[k], the last k appends it to the end
+                    added = matrix[rest_array, candidate[0]]
+                    added[:-1] += matrix[candidate[-1], rest_array[1:]] - matrix[rest_array[:-1], rest_array[1:]]
+                    delta = added - removed
+                    k = int(np.argmin(delta))
+                    if delta[k] < best_delta:
+                        best_delta = delta[k]
+                        best = (k, candidate)
+                if best is not None:
+                    k, candidate = best
+                    order = rest[:k + 1] + list(candidate) + rest[k + 1:]
+                    improved = True
+                i += 1
+    return order
+
+
+def plan_route(points, start_point, max_distance=0):
+    """
+    Builds the route through points from start_point: nearest neighbor, then 2-opt and Or-opt.
+    Points not reachable with steps of at most max_distance (0 for no limit) are dropped.
+
+    Returns:
+        (list, float, float): The ordered points (start_point excluded), the route length and the length
+            of the nearest neighbor route.
+    """
+    if not points:
+        return [], 0.0, 0.0
+    all_points = [start_point] + list(points)
+    matrix = distance_matrix(all_points)
+    if max_distance:
+        matrix[matrix > max_distance] = np.inf
+    greedy = nearest_neighbor(matrix)
+    greedy_length = route_length(matrix, greedy)
+    order = greedy
+    if len(order) > 3:
+        order = or_opt(matrix, two_opt(matrix, order))
+    return [all_points[i] for i in order[1:]], route_length(matrix, order), greedy_length
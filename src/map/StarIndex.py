@@ -0,0 +1,89 @@
+import math
+
+
+class StarIndex:
+    """
+    Uniform grid over box centers for nearest lookups and removal, the cost depends on the
+    stars around the query instead of all of them.
+    """
+
+    def __init__(self, boxes, cell_size):
+        self.cell_size = max(1, cell_size)
+        self.cells = {}
+        self.count = 0
+        self.bounds = None
+        for box in boxes:
+            self.insert(box)
+
+    def __len__(self):
+        return self.count
+
+    def _cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, box):
+        key = self._cell(*box.center())
+        self.cells.setdefault(key, []).append(box)
+        self.count += 1
+        if self.bounds is None:
+            self.bounds = key + key
+        else:
+            min_x, min_y, max_x, max_y = self.bounds
+            self.bounds = min(min_x, key[0]), min(min_y, key[1]), max(max_x, key[0]), max(max_y, key[1])
+
+    def remove(self, box):
+        key = self._cell(*box.center())
+        cell = self.cells.get(key)
+        if cell is None:
+            return False
+        for i, other in enumerate(cell):
+            if other is box:
+                del cell[i]
+                if not cell:
+                    del self.cells[key]
+                self.count -= 1
+                return True
+        return False
+
+    def nearest(self, box):
+        """
+        Returns:
+            (Box, float): The nearest box by center distance and the distance, (None, inf) if empty.
+        """
+        if self.count == 0:
+            return None, math.inf
+        x, y = box.center()
+        cx, cy = self._cell(x, y)
+        best = None
+        best_distance = math.inf
+        ring = 0
+        max_ring = self._max_ring(cx, cy)
+        while ring <= max_ring:
+            for key in ring_cells(cx, cy, ring):
+                for other in self.cells.get(key, ()):
+                    ox, oy = other.center()
+                    distance = math.hypot(ox - x, oy - y)
+                    if distance < best_distance:
+                        best = other
+                        best_distance = distance
+            # everything outside this ring is at least ring * cell_size away
+            if best is not None and best_distance <= ring * self.cell_size:
+                break
+            ring += 1
+        return best, best_distance
+
+    def _max_ring(self, cx, cy):
+        min_x, min_y, max_x, max_y = self.bounds
+        return max(abs(cx - min_x), abs(cx - max_x), abs(cy - min_y), abs(cy - max_y))
+
+
+def ring_cells(cx, cy, ring):
+    if ring == 0:
+        yield cx, cy
+        return
+    for x in range(cx - ring, cx + ring + 1):
+        yield x, cy - ring
+        yield x, cy + ring
+    for y in range(cy - ring + 1, cy + ring):
+        yield cx - ring, y
+        yield cx + ring, y
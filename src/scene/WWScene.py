@@ -5,23 +5,36 @@ from ok import Logger, BaseScene
 logger = Logger.get_logger(__name__)
 
 
+class SceneState:
+    """
+    What the current frame shows, shared by all trigger tasks. Each field is probed at most once per frame,
+    only when a task asks for it, so tasks read the cheap fields first and skip work that can't apply.
+    """
+    fields = ('black', 'login', 'in_world', 'in_combat', 'dialog', 'f_prompt', 'echo_screen')
+
+    def __init__(self, frame=None):
+        self.frame = frame
+        self.values = {}
+
+    def get(self, field, fun):
+        if field not in self.values:
+            self.values[field] = fun()
+        return self.values[field]
+
+    def summary(self):
+        return {field: self.values[field] for field in self.fields if field in self.values}
+
+
 class WWScene(BaseScene):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._in_team = None
-        self._echo_enhance_btn = None
+        self._state = SceneState()
 
     def reset(self):
-        self._in_team = None
-        self._echo_enhance_btn = None
-
-    def in_team(self, fun):
-        if self._in_team is None:
-            self._in_team = fun()
-        return self._in_team
-
-    def echo_enhance_btn(self, fun):
-        if self._echo_enhance_btn is None:
-            self._echo_enhance_btn = fun()
-        return self._echo_enhance_btn
+        self._state = SceneState()
+
+    def state(self, frame):
+        if frame is not self._state.frame:
+            self._state = SceneState(frame)
+        return self._state
@@ -28,7 +28,7 @@ class AutoCombatTask(BaseCombatTask, TriggerTask):
 
     def run(self):
         ret = False
-        if not self.scene.in_team(self.in_team_and_world):
+        if self.scene_state('black') or not self.scene_state('in_world'):
             return ret
         while self.in_combat():
             ret = True
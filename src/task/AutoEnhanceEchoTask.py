@@ -20,13 +20,10 @@ class AutoEnhanceEchoTask(TriggerTask, BaseWWTask, FindFeature):
             '_enabled': False,
         })
 
-    def find_echo_enhance(self):
-        return self.find_one('echo_enhance_btn')
-
     def run(self):
-        if self.scene.in_team(self.in_team_and_world):
+        if self.scene_state('black') or self.scene_state('in_world'):
             return
-        if enhance_button := self.scene.echo_enhance_btn(self.find_echo_enhance):
+        if enhance_button := self.scene_state('echo_screen'):
             wait = False
             while self.find_one('echo_enhance_to', horizontal_variance=0.01):
                 self.click(enhance_button, after_sleep=0.5)
@@ -21,7 +21,9 @@ class AutoLoginTask(BaseWWTask, TriggerTask):
     def run(self):
         if self._logged_in:
             pass
-        elif self.scene.in_team(self.in_team_and_world):
+        elif self.scene_state('black'):
+            return
+        elif self.scene_state('in_world'):
             self._logged_in = True
         else:
             return self.wait_login()
@@ -35,12 +35,11 @@ class AutoPickTask(TriggerTask, BaseWWTask, FindFeature):
         self.sleep(0.2)
 
     def run(self):
-        if not self.scene.in_team(self.in_team_and_world):
+        if self.scene_state('black') or not self.scene_state('in_world'):
             return
         start = time.time()
         while time.time() - start < 1:
-            f = self.find_one('pick_up_f_hcenter_vcenter', box=self.f_search_box,
-                               threshold=0.8)
+            f = self.scene_state('f_prompt')
             if not f:
                 return
             percent = self.calculate_color_percentage(f_white_color, f)
@@ -4,15 +4,20 @@ import time
 import cv2
 import numpy as np
 
-from ok import Logger
+from ok import Box, Logger
 from ok import get_connected_area_by_color, color_range_to_bound
 from ok import safe_get
 from src import text_white_color
 from src.char import BaseChar
-from src.char.BaseChar import Priority, dot_color
+from src.char.BaseChar import Priority, dot_color, forte_white_color
 from src.char.CharFactory import get_char_by_pos
 from src.char.Healer import Healer
+from src.combat.ConRing import ConRingAnalyzer, con_colors, ring_components
+from src.combat.Cooldown import CooldownClassifier
+from src.combat.HudSnapshot import HudSnapshot
 from src.combat.CombatCheck import CombatCheck
+from src.util.LineOcr import bright_component_rect
+from src.util.Profiler import profiled
 
 logger = Logger.get_logger(__name__)
 
@@ -37,6 +42,8 @@ class BaseCombatTask(CombatCheck):
 
         self.char_texts = ['char_1_text', 'char_2_text', 'char_3_text']
         self.add_text_fix({'Ｅ': 'e'})
+        self.con_ring = ConRingAnalyzer(con_colors)
+        self.cooldown = CooldownClassifier()
 
     def send_key_and_wait_animation(self, key, check_function, total_wait=7, enter_animation_wait=0.7):
         start = time.time()
@@ -93,11 +100,44 @@ class BaseCombatTask(CombatCheck):
         raise exception_type(message)
 
     def available(self, name):
-        current = self.calculate_color_percentage(text_white_color,
-                                                  self.get_box_by_name(f'box_{name}'))
-        if current > 0 and not self.has_cd(name):
+        hud = self.hud_snapshot()
+        if hud.percentage(name) > 0 and not hud.has_cd(name):
             return True
 
+    def hud_snapshot(self):
+        """
+        The skill hud state of the current frame, each field probed once per frame when it is first read.
+
+        Returns:
+            HudSnapshot: Snapshot of the skill buttons, forte and con rings.
+        """
+        return self.frame_cache.call(self.frame, 'hud_snapshot', self._new_hud_snapshot, (), {})
+
+    def _new_hud_snapshot(self):
+        return HudSnapshot(self.frame, self._probe_hud)
+
+    def _probe_hud(self, field, *args):
+        if field == 'percentage':
+            return self.calculate_color_percentage(text_white_color, self.get_box_by_name(f'box_{args[0]}'))
+        if field == 'has_cd':
+            return self.has_cd(args[0])
+        if field == 'forte':
+            return self.calculate_color_percentage(forte_white_color, self.forte_box())
+        if field == 'con_rings':
+            return self.analyze_con_rings(*args)
+        raise ValueError(f'unknown hud field {field}')
+
+    def forte_box(self):
+        return self.box_of_screen_scaled(3840, 2160, 2251, 1993, 2311, 2016, name='forte_full', hcenter=True)
+
+    def con_box(self):
+        return self.box_of_screen_scaled(3840, 2160, 1422, 1939, to_x=1566, to_y=2076, name='con_full',
+                                         hcenter=True)
+
+    def analyze_con_rings(self, color_index=-1):
+        return self.con_ring.analyze(self.con_box().crop_frame(self.frame),
+                                     1500 / 3840 / 2160 * self.screen_width * self.screen_height, color_index)
+
     def combat_once(self, wait_combat_time=200):
         self.wait_until(self.in_combat, time_out=wait_combat_time, raise_if_not_found=True)
         self.load_chars()
@@ -226,49 +266,28 @@ class BaseCombatTask(CombatCheck):
     def has_resonance_cd(self):
         return self.has_cd('resonance')
 
+    @profiled
     def has_cd(self, box_name):
+        return self.cd_result(box_name).has_cd
+
+    def cd_result(self, box_name):
+        """
+        Classifies the countdown of a skill box, once per frame and box.
+
+        Returns:
+            CooldownResult: The dot, digit and invalid component counts of the box.
+        """
+        return self.frame_cache.call(self.frame, 'cd_result', self._cd_result, (box_name,), {})
+
+    def _cd_result(self, box_name):
         box = self.get_box_by_name(f'box_{box_name}')
+        return self.reuse_if_unchanged(f'cd_result_{box_name}', box, lambda: self._classify_cd(box))
+
+    def _classify_cd(self, box):
         cropped = box.crop_frame(self.frame)
         num_labels, stats, labels = get_connected_area_by_color(cropped, dot_color, connectivity=8, gray_range=22)
-        big_area_count = 0
-        has_dot = False
-        number_count = 0
-        invalid_count = 0
-        # dot = None
-        # output_image = cropped.copy()
-        for i in range(1, num_labels):
-            # Check if the connected co  mponent touches the border
-            left, top, width, height, area = stats[i]
-            if area / self.frame.shape[0] / self.frame.shape[
-                1] > 20 / 3840 / 2160:
-                big_area_count += 1
-            if left > 0 and top > 0 and left + width < box.width and top + height < box.height:
-                # self.logger.debug(f"{box_name} Area of connected component {i}: {area} pixels {width}x{height} ")
-                if 16 / 3840 / 2160 <= area / self.frame.shape[0] / self.frame.shape[
-                    1] <= 90 / 3840 / 2160 and abs(width - height) / (
-                        width + height) < 0.3 and top / cropped.shape[0] > 0.6:
-                    # if  top < (
-                    #     box.height / 2) and left > box.width * 0.2 and left + width < box.width * 0.8:
-                    has_dot = True
-                    #     self.logger.debug(f"{box_name} multiple dots return False")
-                    #     return False
-                    # dot = stats[i]
-                elif 25 / 2160 <= height / self.screen_height <= 45 / 2160 and 5 / 2160 <= width / self.screen_height <= 35 / 2160:
-                    number_count += 1
-            else:
-                # self.logger.debug(f"{box_name} has invalid return False")
-                invalid_count += 1
-                return False
-
-            # Draw the connected component with a random color
-            # mask = labels == i
-            # import numpy as np
-            # output_image[mask] = np.random.randint(0, 255, size=3)
-        # if self.debug:
-        #     self.screenshot(f'{self}_{box_name}_has_cd', output_image)
-        has_cd = (has_dot and 2 <= number_count <= 3)
-        # self.logger.debug(f'{box_name} has_cd {has_cd} {invalid_count} {number_count} {has_dot}')
-        return has_cd
+        thresholds = self.cooldown.thresholds_of(self.frame.shape[1], self.frame.shape[0], self.screen_height)
+        return self.cooldown.classify(stats[:num_labels], cropped.shape[1], cropped.shape[0], thresholds)
 
     def get_current_char(self, raise_exception=True) -> BaseChar:
         for char in self.chars:
@@ -299,12 +318,10 @@ class BaseCombatTask(CombatCheck):
     def load_hotkey(self, force=False):
         if not self.key_config['HotKey Verify'] or force:
 
-            resonance_key = self.ocr(0.82, 0.92, 0.85, 0.96, match=re.compile(r'^[a-zA-Z]$'), threshold=0.8,
-                                     name='resonance_key', log=True)
-            echo_key = self.ocr(0.88, 0.92, 0.90, 0.96, match=re.compile(r'^[a-zA-Z]$'), threshold=0.8,
-                                name='echo_key', log=True)
-            liberation_key = self.ocr(0.93, 0.92, 0.96, 0.96, match=re.compile(r'^[a-zA-Z]$'), threshold=0.8,
-                                      name='liberation_key', log=True)
+            resonance_key, echo_key, liberation_key = self.ocr_hotkeys(
+                [self.box_of_screen(0.82, 0.92, 0.85, 0.96, name='resonance_key'),
+                 self.box_of_screen(0.88, 0.92, 0.90, 0.96, name='echo_key'),
+                 self.box_of_screen(0.93, 0.92, 0.96, 0.96, name='liberation_key')], re.compile(r'^[a-zA-Z]$'))
             keys_str = str(resonance_key) + str(echo_key) + str(liberation_key)
 
             if echo_key:
@@ -317,6 +334,25 @@ class BaseCombatTask(CombatCheck):
             self.log_info(f'set hotkey success {self.key_config.values()}', notify=True)
             self.info['Skill HotKeys'] = keys_str
 
+    def ocr_hotkeys(self, boxes, match, threshold=0.8):
+        """
+        Reads the key hints in boxes with one batched recognition of their bright key frames, a box
+        without a readable key falls back to ocr with text detection.
+        """
+        frames = []
+        for box in boxes:
+            rect = bright_component_rect(box.crop_frame(self.frame))
+            if rect is not None and min(rect[2], rect[3]) >= self.height_of_screen(0.005):
+                x, y, w, h = rect
+                frames.append(Box(box.x + x, box.y + y, w, h, name=box.name))
+            else:
+                frames.append(box)
+        keys = self.ocr_lines(frames, match=match, threshold=threshold)
+        for i, box in enumerate(boxes):
+            if not keys[i]:
+                keys[i] = self.ocr(box=box, match=match, threshold=threshold, name=box.name, log=True)
+        return keys
+
     def load_chars(self):
         self.load_hotkey()
         in_team, current_index, count = self.in_team()
@@ -368,9 +404,9 @@ class BaseCombatTask(CombatCheck):
     def is_con_full(self, char_config=None):
         return self.get_current_con(char_config) == 1
 
+    @profiled
     def get_current_con(self, char_config=None):
-        box = self.box_of_screen_scaled(3840, 2160, 1422, 1939, to_x=1566, to_y=2076, name='con_full',
-                                        hcenter=True)
+        box = self.con_box().copy()
         box.confidence = 0
 
         max_area = 0
@@ -380,14 +416,13 @@ class BaseCombatTask(CombatCheck):
         target_index = -1
         if char_config:
             target_index = char_config.get('_ring_color_index', target_index)
-        cropped = box.crop_frame(self.frame)
-        for i in range(len(con_colors)):
-            if target_index != -1 and i != target_index:
+        rings = self.hud_snapshot().con_rings_of(target_index)
+        for i in sorted(rings):
+            area, is_full, ring_count = rings[i]
+            if ring_count > 1:
+                self.logger.warning(f'is_con_full found multiple rings {ring_count}')
                 continue
-            color_range = con_colors[i]
-            area, is_full = self.count_rings(cropped, color_range,
-                                             1500 / 3840 / 2160 * self.screen_width * self.screen_height)
-            # self.logger.debug(f'is_con_full test color_range {color_range} {area, is_full}')
+            # self.logger.debug(f'is_con_full test color_range {con_colors[i]} {area, is_full}')
             if is_full:
                 max_is_full = is_full
                 color_index = i
@@ -424,73 +459,12 @@ class BaseCombatTask(CombatCheck):
         return percent
 
     def count_rings(self, image, color_range, min_area):
-        # Define the color range
         lower_bound, upper_bound = color_range_to_bound(color_range)
-
-        # image_with_contours = image.copy()
-
-        # Create a binary mask
-        mask = cv2.inRange(image, lower_bound, upper_bound)
-
-        # Find connected components
-        num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
-
-        colors = [
-            (0, 255, 0),  # Green
-            (0, 0, 255),  # Red
-            (255, 0, 0),  # Blue
-            (0, 255, 255),  # Yellow
-            (255, 0, 255),  # Magenta
-            (255, 255, 0)  # Cyan
-        ]
-
-        # Function to check if a component forms a ring
-        def is_full_ring(component_mask):
-            # Find contours
-            contours, _ = cv2.findContours(component_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            if len(contours) != 1:
-                return False
-            contour = contours[0]
-
-            # Check if the contour is closed by checking if the start and end points are the same
-            # if cv2.arcLength(contour, True) > 0:
-            #     return True
-            # Approximate the contour with polygons.
-            epsilon = 0.05 * cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, epsilon, True)
-
-            # Check if the polygon is closed (has no gaps) and has a reasonable number of vertices for a ring.
-            if not cv2.isContourConvex(approx) or len(approx) < 4:
-                return False
-
-            # All conditions met, likely a close ring.
-            return True
-
-        # Iterate over each component
-        ring_count = 0
-        is_full = False
-        the_area = 0
-        for label in range(1, num_labels):
-            x, y, width, height, area = stats[label, :5]
-            bounding_box_area = width * height
-            component_mask = (labels == label).astype(np.uint8) * 255
-            contours, _ = cv2.findContours(component_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            # color = colors[label % len(colors)]
-            # cv2.drawContours(image_with_contours, contours, -1, color, 2)
-            if bounding_box_area >= min_area:
-                # Select a color from the list based on the label index
-                if is_full_ring(component_mask):
-                    is_full = True
-                the_area = area
-                ring_count += 1
-
-        # Save or display the image with contours
-        # cv2.imwrite(f'test\\test_{self}_{is_full}_{the_area}_{lower_bound}.jpg', image_with_contours)
+        the_area, is_full, ring_count = ring_components(cv2.inRange(image, lower_bound, upper_bound), min_area)
         if ring_count > 1:
             is_full = False
             the_area = 0
             self.logger.warning(f'is_con_full found multiple rings {ring_count}')
-
         return the_area, is_full
 
 
@@ -499,36 +473,3 @@ white_color = {
     'g': (253, 255),  # Green range
     'b': (253, 255)  # Blue range
 }
-
-con_colors = [
-    {
-        'r': (205, 235),
-        'g': (190, 222),  # for yellow spectro
-        'b': (90, 130)
-    },
-    {
-        'r': (150, 190),  # Red range
-        'g': (95, 140),  # Green range for purple electric
-        'b': (210, 249)  # Blue range
-    },
-    {
-        'r': (200, 230),  # Red range
-        'g': (100, 130),  # Green range    for red fire
-        'b': (75, 105)  # Blue range
-    },
-    {
-        'r': (60, 95),  # Red range
-        'g': (150, 180),  # Green range    for blue ice
-        'b': (210, 245)  # Blue range
-    },
-    {
-        'r': (70, 110),  # Red range
-        'g': (215, 250),  # Green range    for green wind
-        'b': (155, 190)  # Blue range
-    },
-    {
-        'r': (190, 220),  # Red range
-        'g': (65, 105),  # Green range    for havoc
-        'b': (145, 175)  # Blue range
-    }
-]
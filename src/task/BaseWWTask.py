@@ -5,18 +5,47 @@ from datetime import datetime, timedelta
 import numpy as np
 
 from ok import BaseTask, Logger, find_boxes_by_name, og, Box
-from ok import CannotFindException
+from ok import CannotFindException, safe_get, is_pure_black
 import cv2
 
+from src.util.BatchMatch import BatchMatcher
+from src.util.BoxRegistry import BoxRegistry
+from src.util.ColorPercentage import ColorPercentageEngine
+from src.util.DirtyRegions import DirtyRegionTracker
+from src.util.FrameCache import FrameCache, copy_result, make_key
+from src.util.GlyphReader import GlyphReader
+from src.util.LineOcr import LineRecognizer
+from src.util.OcrCache import OcrCache, roi_hash
+from src.util.Profiler import profiled
+from src.map.ArrowTemplateBank import get_arrow_bank
+from src.scene.WWScene import WWScene
+
 
 logger = Logger.get_logger(__name__)
 number_re = re.compile(r'^(\d+)$')
 stamina_re = re.compile(r'^(\d+)/(\d+)$')
+in_team_features = ('char_1_text', 'char_2_text', 'char_3_text')
 f_white_color = {
     'r': (235, 255),  # Red range
     'g': (235, 255),  # Green range
     'b': (235, 255)  # Blue range
 }
+aim_color = {
+    'r': (150, 190),  # Red range
+    'g': (148, 172),  # Green range
+    'b': (22, 62)  # Blue range
+}
+skip_re = re.compile(r'SKIP|跳过', re.IGNORECASE)
+# SceneState field -> the method probing it
+scene_probes = {
+    'black': 'is_black_frame',
+    'login': 'find_login',
+    'in_world': 'in_team_and_world',
+    'in_combat': 'in_combat_hint',
+    'dialog': 'find_skip_dialog',
+    'f_prompt': 'find_f_prompt',
+    'echo_screen': 'find_echo_enhance',
+}
 
 class BaseWWTask(BaseTask):
     map_zoomed = False
@@ -27,6 +56,16 @@ class BaseWWTask(BaseTask):
         self.monthly_card_config = self.get_global_config('Monthly Card Config')
         self.next_monthly_card_start = 0
         self._logged_in = False
+        self._echo_track_box = None
+        self.frame_cache = FrameCache()
+        self.color_engine = ColorPercentageEngine()
+        self.box_registry = BoxRegistry()
+        self.ocr_cache = OcrCache()
+        self.glyph_readers = {}
+        self.line_recognizer = None
+        self.dirty_regions = DirtyRegionTracker()
+        self._stamina_boxes = None
+        self.batch_matcher = BatchMatcher()
         self.bosses_pos = {
             'Bell-Borne Geochelone': [0, 0, False],
             'Dreamless': [0, 2, True],
@@ -64,6 +103,214 @@ class BaseWWTask(BaseTask):
             self.click_relative(0.94, 0.33, after_sleep=0.5)
             self.send_key('esc', after_sleep=1)
 
+    @profiled
+    def find_one(self, *args, **kwargs):
+        return self.frame_cache.call(self.frame, 'find_one', super().find_one, args, kwargs)
+
+    @profiled
+    def calculate_color_percentage(self, *args, **kwargs):
+        return self.frame_cache.call(self.frame, 'calculate_color_percentage', self._calculate_color_percentage,
+                                     args, kwargs)
+
+    def _calculate_color_percentage(self, color, box, *args, **kwargs):
+        percentage = None
+        if isinstance(box, Box) and self.frame is not None and not args and not kwargs:
+            percentage = self.color_engine.percentage(self.frame, color, box)
+        if percentage is None:
+            return super().calculate_color_percentage(color, box, *args, **kwargs)
+        if percentage > 0:
+            # the box may be a shared registry box
+            box = box.copy()
+            box.confidence = percentage
+            self.draw_boxes(box.name, box)
+        return percentage
+
+    def get_box_by_name(self, name):
+        if isinstance(name, Box):
+            return name
+        return self.box_registry.get((self.width, self.height), 'get_box_by_name', super().get_box_by_name,
+                                     (name,), {})
+
+    def box_of_screen(self, *args, **kwargs):
+        return self.box_registry.get((self.width, self.height), 'box_of_screen', super().box_of_screen, args,
+                                     kwargs)
+
+    def box_of_screen_scaled(self, *args, **kwargs):
+        return self.box_registry.get((self.width, self.height), 'box_of_screen_scaled',
+                                     super().box_of_screen_scaled, args, kwargs)
+
+    @profiled
+    def ocr(self, *args, **kwargs):
+        return self.frame_cache.call(self.frame, 'ocr', self._cached_ocr, args, kwargs)
+
+    def ocr_lines(self, boxes, match=None, threshold=0):
+        """
+        Recognition only ocr of small single line boxes: no text detection, every box is read as one line
+        and all of them in one batched recognizer call.
+
+        Args:
+            boxes: Tight boxes around the text lines.
+            match: Same as ocr, str, list or regex the text must match.
+            threshold (float): Minimum recognition score.
+
+        Returns:
+            (list): For every box, [the box named by its text] when it matches, else [].
+        """
+        results = [None] * len(boxes)
+        todo = []
+        for i, box in enumerate(boxes):
+            crop = box.crop_frame(self.frame)
+            key = 'ocr_lines', roi_hash(crop)
+            results[i] = self.ocr_cache.get(key) if self.ocr_cache.enabled else None
+            if results[i] is None:
+                todo.append((i, key, crop))
+        if todo:
+            if self.line_recognizer is None or self.line_recognizer.engine is not self.executor.ocr_lib:
+                self.line_recognizer = LineRecognizer(self.executor.ocr_lib)
+            if not self.line_recognizer.available:
+                return [[] for _ in boxes]
+            for (i, key, _), result in zip(todo, self.line_recognizer.recognize([crop for _, _, crop in todo])):
+                self.ocr_cache.put(key, result)
+                results[i] = result
+        lines = []
+        for box, (text, score) in zip(boxes, results):
+            line = Box(box.x, box.y, box.width, box.height, confidence=score, name=text)
+            if text and score >= threshold and (match is None or find_boxes_by_name([line], match)):
+                lines.append([line])
+            else:
+                lines.append([])
+        return lines
+
+    def ocr_digits(self, name, box, match):
+        """
+        Reads a fixed font number in box with the glyphs learned from earlier confident ocr of the
+        same reader, falls back to ocr when a glyph is unknown or weak and learns from its result.
+        Every verify_every template read is also checked against ocr.
+
+        Returns:
+            (list): Same as ocr(box=box, match=match).
+        """
+        reader = self.glyph_reader(name)
+        crop = box.crop_frame(self.frame)
+        resolution = self.frame.shape[:2]
+        found = reader.read(crop, resolution)
+        if found is not None:
+            text, score = found
+            line = Box(box.x, box.y, box.width, box.height, confidence=score, name=text)
+            if not find_boxes_by_name([line], match):
+                found = None
+            elif not reader.should_verify():
+                return [line]
+        if found is None:
+            reader.fallbacks += 1
+        texts = self.ocr(box=box, match=match)
+        if len(texts) == 1 and texts[0].confidence >= 0.9:
+            if found is not None:
+                reader.verify(found[0], texts[0].name)
+                self.info_set(f'{name} Glyph Accuracy', round(reader.accuracy, 3))
+            reader.learn(crop, texts[0].name, resolution)
+        return texts
+
+    def glyph_reader(self, name):
+        reader = self.glyph_readers.get(name)
+        if reader is None:
+            reader = self.glyph_readers[name] = GlyphReader()
+        return reader
+
+    def _cached_ocr(self, *args, **kwargs):
+        key = self._ocr_key(args, kwargs)
+        if key is None:
+            return super().ocr(*args, **kwargs)
+        result = self.ocr_cache.get(key)
+        if result is None:
+            result = super().ocr(*args, **kwargs)
+            if result is not None:
+                self.ocr_cache.put(key, copy_result(result))
+            return result
+        return copy_result(result)
+
+    def _ocr_key(self, args, kwargs):
+        """
+        The ocr arguments and the hash of the pixels they read, None if the ROI can not be told.
+        """
+        if not self.ocr_cache.enabled or self.frame is None or len(args) > 4:
+            return None
+        if kwargs.keys() & {'frame', 'frame_processor', 'width', 'height'}:
+            return None
+        key = make_key('ocr', args, kwargs)
+        if key is None:
+            return None
+        box = kwargs.get('box')
+        if box is None:
+            x, y, to_x, to_y = list(args) + [0, 0, 1, 1][len(args):]
+            box = self.box_of_screen(kwargs.get('x', x), kwargs.get('y', y), kwargs.get('to_x', to_x),
+                                     kwargs.get('to_y', to_y))
+        elif isinstance(box, str):
+            box = self.get_box_by_name(box)
+        return key, roi_hash(box.crop_frame(self.frame))
+
+    def reuse_if_unchanged(self, name, box, fun):
+        """
+        Returns the last result of fun under name while the pixels of box did not change, else calls it.
+        """
+        return self.dirty_regions.reuse(self.frame, name, box, fun)
+
+    def next_frame(self):
+        self.frame_cache.clear()
+        self.color_engine.clear()
+        return super().next_frame()
+
+    def find_features_batch(self, names, box=None, threshold=0.8, use_gray_scale=False, horizontal_variance=0.002,
+                            vertical_variance=0.002):
+        """
+        Find several features in one pass over a shared crop of the frame.
+
+        Args:
+            names: Feature names.
+            box (Box): Search every feature in this box, defaults to each feature's own position
+                widened by the variances (fractions of the screen, same as find_one).
+
+        Returns:
+            (dict): name -> found Box or None.
+        """
+        return self.frame_cache.call(self.frame, 'find_features_batch', self._find_features_batch, (tuple(names),),
+                                     dict(box=box, threshold=threshold, use_gray_scale=use_gray_scale,
+                                          horizontal_variance=horizontal_variance,
+                                          vertical_variance=vertical_variance))
+
+    def _find_features_batch(self, names, box=None, threshold=0.8, use_gray_scale=False, horizontal_variance=0.002,
+                             vertical_variance=0.002):
+        targets = []
+        x_variance = self.width * horizontal_variance
+        y_variance = self.height * vertical_variance
+        for name in names:
+            feature = self.get_feature_by_name(name)
+            search_box = box
+            if search_box is None:
+                search_box = self.get_box_by_name(name).copy(x_offset=-x_variance, width_offset=2 * x_variance,
+                                                             y_offset=-y_variance, height_offset=2 * y_variance)
+            targets.append((name, search_box, feature.mat, getattr(feature, 'mask', None)))
+        return self.batch_matcher.match(self.frame, targets, threshold, use_gray_scale=use_gray_scale)
+
+    def find_best_match_in_box(self, box, to_find, threshold, use_gray_scale=False):
+        found = self.find_features_batch(to_find, box=box, threshold=threshold, use_gray_scale=use_gray_scale)
+        return max((match for match in found.values() if match), key=lambda match: match.confidence, default=None)
+
+    def find_arrow_angle(self, box_name='arrow', with_mask=False):
+        """
+        Finds the heading of the minimap arrow, matching the precomputed rotations of the 'arrow' template
+        coarse to fine instead of rotating and matching all 360 angles every call.
+
+        Returns:
+            (int, Box): Angle in degrees clockwise and the matched arrow box.
+        """
+        bank = get_arrow_bank(self.get_feature_by_name('arrow').mat, with_mask=with_mask)
+        target_box = self.get_box_by_name(box_name)
+        angle, confidence, (x, y) = bank.search(target_box.crop_frame(self.frame))
+        target = Box(target_box.x + x, target_box.y + y, bank.width, bank.height, name=f'arrow_{angle}')
+        target.confidence = confidence
+        return angle, target
+
     def validate(self, key, value):
         message = self.validate_config(key, value)
         if message:
@@ -145,11 +392,12 @@ class BaseWWTask(BaseTask):
         last_direction = None
         start = time.time()
         no_echo_start = 0
+        self._echo_track_box = None
         while time.time() - start < time_out:
             self.next_frame()
             if self.pick_echo():
                 return True
-            echos = self.find_echos()
+            echos = self.find_echos(max_result_age=0.3, adaptive=True)
             if not echos:
                 if no_echo_start == 0:
                     no_echo_start = time.time()
@@ -325,18 +573,53 @@ class BaseWWTask(BaseTask):
         return True
 
     def get_stamina(self):
-        boxes = self.wait_ocr(0.49, 0.01, 0.92, 0.10, log=True, raise_if_not_found=False,
-                              match=[number_re, stamina_re])
-        if len(boxes) == 0:
-            return -1, -1
-        current_box = find_boxes_by_name(boxes, stamina_re)[0]
+        current_box = back_up_box = None
+        if self._stamina_boxes is not None:
+            # the numbers stay in place, read them where the last ocr found them
+            boxes, margins = self._stamina_boxes
+            current_box = safe_get(self.ocr_digits('stamina', boxes[0], stamina_re), 0)
+            back_up_box = safe_get(self.ocr_digits('stamina', boxes[1], number_re), 0)
+            if not self.stamina_boxes_valid(current_box, back_up_box, boxes, margins):
+                # a number gained a digit and outgrew its box, find them again
+                self._stamina_boxes = None
+                current_box = back_up_box = None
+        if current_box is None or back_up_box is None:
+            boxes = self.wait_ocr(0.49, 0.01, 0.92, 0.10, log=True, raise_if_not_found=False,
+                                  match=[number_re, stamina_re])
+            if len(boxes) == 0:
+                return -1, -1
+            current_box = find_boxes_by_name(boxes, stamina_re)[0]
+            back_up_box = find_boxes_by_name(boxes, number_re)[0]
+            pad = self.height_of_screen(0.005)
+            boxes = tuple(box.copy(x_offset=-pad, y_offset=-pad, width_offset=2 * pad, height_offset=2 * pad)
+                          for box in (current_box, back_up_box))
+            self._stamina_boxes = boxes, [self.number_margins(box) for box in boxes]
         current = int(current_box.name.split('/')[0])
-        back_up_box = find_boxes_by_name(boxes, number_re)[0]
         back_up = int(back_up_box.name)
         self.info_set('current_stamina', current)
         self.info_set('back_up_stamina', back_up)
         return current, back_up
 
+    def stamina_boxes_valid(self, current_box, back_up_box, boxes, margins):
+        if current_box is None or back_up_box is None:
+            return False
+        # a digit more shows up next to the box, the read inside of it would be cut
+        if any(not np.array_equal(self.number_margins(box), margin) for box, margin in zip(boxes, margins)):
+            return False
+        current, max_stamina = current_box.name.split('/')
+        return int(current) <= int(max_stamina)
+
+    def number_margins(self, box):
+        """
+        Returns:
+            (np.ndarray): Bright mask of one text height left and right of box, the box itself blanked.
+        """
+        wide = box.copy(x_offset=-box.height, width_offset=2 * box.height)
+        mask = self.glyph_reader('stamina').bright(wide.crop_frame(self.frame))
+        x = box.x - max(0, wide.x)
+        mask[:, max(0, x):x + box.width] = 0
+        return mask
+
     def ensure_stamina(self, min_stamina, max_stamina):
         current, back_up = self.get_stamina()
         if current >= max_stamina:
@@ -436,39 +719,66 @@ class BaseWWTask(BaseTask):
         result = self.executor.ocr_lib(image, use_det=True, use_cls=False, use_rec=True)
         self.logger.info(f'ocr_result {result}')
 
-    def find_echos(self, threshold=0.6):
+    def find_echos(self, threshold=0.6, max_result_age=0, box=None, adaptive=False):
         """
         Main function to load ONNX model, perform inference, draw bounding boxes, and display the output image.
 
         Args:
-            onnx_model (str): Path to the ONNX model.
-            input_image (ndarray): Path to the input image.
+            threshold (float): Minimum confidence of an echo.
+            max_result_age (float): If > 0, submit the frame asynchronously and return the latest finished
+                result when it is at most this many seconds old, instead of waiting for the current frame.
+            box (Box): Only detect inside this region, defaults to the full frame.
+            adaptive (bool): Detect inside a region around the last found echo first, which is upscaled to the
+                model input, and fall back to box/the full frame when nothing is found there.
 
         Returns:
             list: List of dictionaries containing detection information such as class_id, class_name, confidence, etc.
         """
-        # Load the ONNX model
-        ret = og.my_app.yolo_detect(self.frame, threshold=threshold, label=0)
-
-        for box in ret:
-            box.y += box.height * 1/3
-            box.height = 1
+        search_box = box
+        if adaptive and self._echo_track_box is not None:
+            search_box = self.echo_track_search_box(self._echo_track_box, box)
+        if max_result_age > 0:
+            future = og.my_app.yolo_detect_async(self.frame, threshold=threshold, label=0, box=search_box)
+            result = og.my_app.yolo_latest_result()
+            if result is None or result.age > max_result_age or result.threshold != threshold or result.label != 0:
+                result = future.result()
+            boxes = result.boxes
+        else:
+            boxes = og.my_app.yolo_detect(self.frame, threshold=threshold, label=0, box=search_box)
+        if not boxes and search_box is not box:
+            self.log_debug(f'no echo in tracked region {search_box}, fall back to {box}')
+            boxes = og.my_app.yolo_detect(self.frame, threshold=threshold, label=0, box=box)
+        if adaptive:
+            self._echo_track_box = boxes[0] if boxes else None
+
+        ret = [echo.copy(y_offset=echo.height * 1 / 3, height_offset=1 - echo.height) for echo in boxes]
         self.draw_boxes("echo", ret)
         return ret
 
-    def yolo_find_all(self, threshold=0.3):
+    def echo_track_search_box(self, last_echo, bound=None):
+        # a square around the last echo, the letterbox then spends the whole model input on it
+        size = min(max(last_echo.width * 4, last_echo.height * 4, self.height_of_screen(0.3)), self.height)
+        x, y = last_echo.center()
+        left, top, right, bottom = 0, 0, self.width, self.height
+        if bound is not None:
+            left, top, right, bottom = bound.x, bound.y, bound.x + bound.width, bound.y + bound.height
+        x = int(min(max(x - size / 2, left), max(right - size, left)))
+        y = int(min(max(y - size / 2, top), max(bottom - size, top)))
+        return Box(x, y, int(min(size, right - x)), int(min(size, bottom - y)), name='echo_track')
+
+    def yolo_find_all(self, threshold=0.3, box=None):
         """
         Main function to load ONNX model, perform inference, draw bounding boxes, and display the output image.
 
         Args:
-            onnx_model (str): Path to the ONNX model.
-            input_image (ndarray): Path to the input image.
+            threshold (float): Minimum confidence of a detection.
+            box (Box): Only detect inside this region, defaults to the full frame.
 
         Returns:
             list: List of dictionaries containing detection information such as class_id, class_name, confidence, etc.
         """
         # Load the ONNX model
-        boxes = og.my_app.yolo_detect(self.frame, threshold=threshold, label=-1)
+        boxes = og.my_app.yolo_detect(self.frame, threshold=threshold, label=-1, box=box)
         ret = sorted(boxes, key=lambda detection: detection.confidence, reverse=True)
         return ret
 
@@ -596,13 +906,59 @@ class BaseWWTask(BaseTask):
         return self.in_team()[
             0]  # and self.find_one(f'gray_book_button', threshold=0.7, canny_lower=50, canny_higher=150)
 
+    def scene_state(self, field):
+        """
+        Returns a field of the SceneState shared by the tasks for the current frame, probed once per frame.
+        """
+        probe = getattr(self, scene_probes[field])
+        if not isinstance(self.scene, WWScene):
+            return probe()
+        return self.scene.state(self.frame).get(field, probe)
+
+    def is_black_frame(self):
+        return is_pure_black(self.frame)
+
+    def find_login(self):
+        return self.find_one('login_account', threshold=0.7)
+
+    def in_combat_hint(self):
+        # the yellow aim around a targeted enemy, cheaper than the full in_combat check
+        return bool(self.has_target())
+
+    def has_target(self):
+        return self.target_aimed()
+
+    def target_aimed(self, long_actionbar=False):
+        if long_actionbar:
+            outer_box = 'box_target_enemy_long'
+            inner_box = 'box_target_enemy_long_inner'
+        else:
+            outer_box = 'box_target_enemy'
+            inner_box = 'box_target_enemy_inner'
+        outer = self.get_box_by_name(outer_box)
+        aim_percent, aim_inner_percent = self.reuse_if_unchanged(
+            f'has_target_{outer_box}', outer,
+            lambda: (self.calculate_color_percentage(aim_color, outer),
+                     self.calculate_color_percentage(aim_color, self.get_box_by_name(inner_box))))
+        # logger.debug(f'box_target_enemy yellow percent {aim_percent} {aim_inner_percent}')
+        if aim_percent - aim_inner_percent > 0.02:
+            return True
+
+    def find_skip_dialog(self):
+        return self.reuse_if_unchanged('check_skip', self.box_of_screen(0.03, 0.03, 0.11, 0.10),
+                                       lambda: self.ocr(0.03, 0.03, 0.11, 0.10, target_height=540, match=skip_re,
+                                                        threshold=0.7))
+
+    def find_f_prompt(self):
+        return self.find_one('pick_up_f_hcenter_vcenter', box=self.f_search_box, threshold=0.8)
+
+    def find_echo_enhance(self):
+        return self.find_one('echo_enhance_btn')
+
+    @profiled
     def in_team(self):
-        c1 = self.find_one('char_1_text',
-                           threshold=0.75)
-        c2 = self.find_one('char_2_text',
-                           threshold=0.75)
-        c3 = self.find_one('char_3_text',
-                           threshold=0.75)
+        found = self.find_features_batch(in_team_features, threshold=0.75)
+        c1, c2, c3 = (found[name] for name in in_team_features)
         arr = [c1, c2, c3]
         # logger.debug(f'in_team check {arr} time: {(time.time() - start):.3f}s')
         current = -1
@@ -3,6 +3,7 @@ import time
 from ok import Logger
 from src.task.BaseCombatTask import BaseCombatTask
 from src.task.WWOneTimeTask import WWOneTimeTask
+from src.util.Profiler import profiler
 
 logger = Logger.get_logger(__name__)
 
@@ -14,9 +15,26 @@ class DiagnosisTask(WWOneTimeTask, BaseCombatTask):
         self.description = "Diagnosis Problem, Performance Test, Run in Game World"
         self.name = "Diagnosis"
         self.start = 0
+        self.last_profile_dump = 0
+        self.default_config.update({
+            'Profile Hot Path': False,
+        })
+        self.config_description = {
+            'Profile Hot Path': 'Show p50/p95/p99 and calls per second of the recognition checks, saved to logs/profile.json',
+        }
 
     def run(self):
         super().run()
+        profiler.enabled = self.config.get('Profile Hot Path')
+        profiler.reset()
+        try:
+            self.diagnose()
+        finally:
+            if profiler.enabled:
+                profiler.dump()
+                profiler.enabled = False
+
+    def diagnose(self):
         if not self.in_team()[0]:
             self.log_error('must be in game world and in teams, please check you game resolution is 16:9', notify=True)
             return
@@ -44,6 +62,17 @@ class DiagnosisTask(WWOneTimeTask, BaseCombatTask):
                 self.info['Liberation in CD'] = char.has_cd('liberation')
                 self.info['Liberation Available'] = char.current_liberation() > 0
                 self.info['Concerto'] = char.get_current_con()
+                self.info['Frame Cache Hit Rate'] = round(self.frame_cache.hit_rate, 3)
+                self.info['Color Table Queries'] = self.color_engine.table_queries
+                self.info['Color Tables Built'] = self.color_engine.tables_built
+                self.info['OCR Cache Hit Rate'] = round(self.ocr_cache.hit_rate, 3)
+                self.info['Region Reuse Hit Rate'] = round(self.dirty_regions.hit_rate, 3)
+                self.info['Region Reuse Saved ms'] = round(self.dirty_regions.saved * 1000)
+                if profiler.enabled:
+                    profiler.update_info(self.info)
+                    if time.time() - self.last_profile_dump > 10:
+                        self.last_profile_dump = time.time()
+                        profiler.dump()
                 self.next_frame()
 
     def choose_level(self, start):
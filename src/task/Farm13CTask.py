@@ -51,44 +51,12 @@ class Farm13CTask(WWOneTimeTask, BaseCombatTask):
             self.sleep(0.1)
 
     def get_cords(self):
-        cords = self.ocr(0.01, 0.95, 0.21, 1, match=self.cords_re, log=True)
+        cords = self.ocr_digits('cords', self.box_of_screen(0.01, 0.95, 0.21, 1, name='cords'), self.cords_re)
         if cords:
             return cords[0].name
 
     def get_angle(self):
-        arrow_template = self.get_feature_by_name('arrow')
-        original_mat = arrow_template.mat
-        max_conf = 0
-        max_angle = 0
-        max_target = None
-        max_mat = None
-        (h, w) = arrow_template.mat.shape[:2]
-        # self.log_debug(f'turn_east h:{h} w:{w}')
-        center = (w // 2, h // 2)
-        target_box = self.get_box_by_name('box_arrow')
-        # if self.debug:
-        #     self.screenshot('arrow_original', original_ mat)
-        for angle in range(0, 360):
-            # Rotate the template image
-            rotation_matrix = cv2.getRotationMatrix2D(center, -angle, 1.0)
-            arrow_template.mat = cv2.warpAffine(original_mat, rotation_matrix, (w, h))
-            arrow_template.mask = np.where(np.all(arrow_template.mat == [0, 0, 0], axis=2), 0, 255).astype(np.uint8)
-
-            target = self.find_one(f'arrow_{angle}', box=target_box,
-                                   template=arrow_template, threshold=0.01)
-            # if self.debug and angle % 90 == 0:
-            #     self.screenshot(f'arrow_rotated_{angle}', arrow_template.mat)
-            if target and target.confidence > max_conf:
-                max_conf = target.confidence
-                max_angle = angle
-                max_target = target
-                max_mat = arrow_template.mat
-        arrow_template.mat = original_mat
-        # arrow_template.mask = None
-        # if self.debug and max_mat is not None:
-        #     self.screenshot('max_mat',frame=max_mat)
-        # self.log_debug(f'turn_east max_conf: {max_conf} {max_angle}')
-        return max_angle , max_target
+        return self.find_arrow_angle('box_arrow', with_mask=True)
 
     def find_next_star(self):
         stars = self.find_stars()
@@ -8,6 +8,11 @@ import numpy as np
 from qfluentwidgets import FluentIcon
 
 from ok import Logger, Box, get_bounding_box
+from src.map.ArrowHeading import estimate_heading
+from src.map.MinimapLocator import MinimapLocator, create_circle_mask_with_hole
+from src.map.PositionTracker import PositionTracker
+from src.map.RoutePlanner import plan_route
+from src.map.StarIndex import StarIndex
 from src.task.BaseCombatTask import BaseCombatTask
 from src.task.WWOneTimeTask import WWOneTimeTask
 
@@ -18,15 +23,21 @@ class BigMap(WWOneTimeTask, BaseCombatTask):
         super().__init__(*args, **kwargs)
         self.big_map_frame = None
         self.stars = None
-        self.my_box = None
         self.diamond = None
+        self.locator = None
+        self.tracker = None
+        self.my_location = None
+        self.star_index = None
 
 
     def reset(self):
         self.big_map_frame = None
         self.stars = None
-        self.my_box = None
         self.diamond = None
+        self.locator = None
+        self.tracker = None
+        self.my_location = None
+        self.star_index = None
 
     def load_stars(self, wait_world=True):
         self.reset()
@@ -37,13 +48,14 @@ class BigMap(WWOneTimeTask, BaseCombatTask):
             raise Exception('Need be in the map screen and have a diamond as the starting point!')
         self.stars = self.find_feature('big_map_star', threshold=0.7, frame=self.big_map_frame, box=Box(0,0,self.big_map_frame.shape[1],self.big_map_frame.shape[0]))
         all_star_len = len(self.stars)
-        self.stars = sort_stars(self.stars, self.diamond, self.height_of_screen(0.2))
+        self.stars, route_length, greedy_length = plan_route(self.stars, self.diamond, self.height_of_screen(0.2))
+        self.log_info(f'planned route length {route_length:.0f}, nearest neighbor {greedy_length:.0f}')
+        self.info_set('Route Length', f'{route_length:.0f} / {greedy_length:.0f}')
         self.stars.insert(0, self.diamond)
-        mini_map_box = self.get_box_by_name('box_minimap')
-        self.my_box = self.diamond.scale(mini_map_box.width/self.diamond.width * 2)
-        # if self.debug:
-        #     init_my_box = self.my_box.crop_frame(self.frame)
-        #     self.screenshot('init_my_box', frame=init_my_box)
+        self.star_index = StarIndex(self.stars, self.height_of_screen(0.05))
+        self.locator = MinimapLocator(self.big_map_frame)
+        self.tracker = PositionTracker(max_uncertainty=self.height_of_screen(0.015))
+        self.tracker.reset(self.diamond.center())
         if len(self.stars) <= 2:
             raise Exception('Need be in the map screen and have a path of at least 3 stars!')
 
@@ -67,129 +79,104 @@ class BigMap(WWOneTimeTask, BaseCombatTask):
             to_turn += 360
         return to_turn
 
-    def get_my_angle(self):
+    def get_my_angle(self, method=None):
+        if method is None:
+            method = self.config.get('Heading Method', 'Template')
+        if method == 'Arrow Shape':
+            heading = estimate_heading(self.get_box_by_name('arrow').crop_frame(self.frame))
+            if heading is not None:
+                return heading[0]
+            self.log_debug('arrow shape heading not found, fall back to template')
         return self.rotate_arrow_and_find()[0]
 
     def rotate_arrow_and_find(self):
-        arrow_template = self.get_feature_by_name('arrow')
-        original_mat = arrow_template.mat
-        max_conf = 0
-        max_angle = 0
-        max_target = None
-        max_mat = None
-        (h, w) = arrow_template.mat.shape[:2]
-        # self.log_debug(f'turn_east h:{h} w:{w}')
-        center = (w // 2, h // 2)
-        target_box = self.get_box_by_name('arrow')
-        # if self.debug:
-        #     self.screenshot('arrow_original', original_ mat)
-        for angle in range(0, 360):
-            # Rotate the template image
-            rotation_matrix = cv2.getRotationMatrix2D(center, -angle, 1.0)
-            template = cv2.warpAffine(original_mat, rotation_matrix, (w, h))
-            # mask = np.where(np.all(template == [0, 0, 0], axis=2), 0, 255).astype(np.uint8)
-
-            target = self.find_one(box=target_box,
-                                   template=template, threshold=0.01)
-            # if self.debug and angle % 90 == 0:
-            #     self.screenshot(f'arrow_rotated_{angle}', arrow_template.mat)
-            if target and target.confidence > max_conf:
-                max_conf = target.confidence
-                max_angle = angle
-                max_target = target
-                # max_mat = template
-        # arrow_template.mat = original_mat
-        # arrow_template.mask = None
-        # if self.debug and max_mat is not None:
-        #     self.screenshot('max_mat',frame=max_mat)
-        # self.log_debug(f'turn_east max_conf: {max_conf} {max_angle}')
-        return max_angle, max_target
+        return self.find_arrow_angle('arrow')
+
+    @property
+    def star_move_distance_threshold(self):
+        return self.height_of_screen(0.03)
 
     def find_closest(self, my_box):
-        min_distance = 100000
-        min_star = None
-        if len(self.stars) == 0:
-            return None, 0, 0
-        for star in self.stars:
-            distance = star.center_distance(my_box)
-            if distance < min_distance:
-                min_distance = distance
-                min_star = star
-        return min_star
+        return self.star_index.nearest(my_box)[0]
 
-    def find_direction_angle(self, screenshot=False):
+    def find_direction_angle(self, screenshot=False, locate_unless_below=None):
+        """
+        Args:
+            locate_unless_below (float): Locate if the predicted distance to the star is not below it.
+
+        Returns:
+            (tuple): The star, the distance to it, the angle to turn and if the position was located, not predicted.
+        """
         if len(self.stars) == 0:
-            return None, 0, 0
-        my_box = self.find_my_location(screenshot=screenshot)
-        sort_stars(self.stars, my_box,0)
-        min_star = self.stars[0]
+            return None, 0, 0, False
+        my_angle = self.get_my_angle()
+        my_box = self.predict_my_location(my_angle)
+        # always locate close to a star, reaching it must not depend on a guess
+        located = my_box is None or self.find_closest(my_box).center_distance(my_box) <= \
+                  self.tracker.max_uncertainty * 4
+        if not located and locate_unless_below is not None:
+            # a guess that does not get closer can't tell if we are stuck
+            located = self.closest_star(my_box).center_distance(my_box) >= locate_unless_below
+        if located:
+            my_box = self.find_my_location(screenshot=screenshot, heading=my_angle)
+        else:
+            self.tracker.skipped += 1
+        self.info_set('Tracker Skip Rate', round(self.tracker.skip_rate, 3))
+        min_star = self.closest_star(my_box)
         min_distance = my_box.center_distance(min_star)
         self.draw_boxes('star', min_star, color='green')
         direction_angle = calculate_angle_clockwise(my_box, min_star)
-        my_angle = self.get_my_angle()
         to_turn = self.get_angle_between(my_angle, direction_angle)
         # self.log_debug(f'direction_angle {to_turn} {my_angle} {direction_angle}  min_distance {min_distance} min_star {min_star} ')
-        return min_star, min_distance, to_turn
+        return min_star, min_distance, to_turn, located
+
+    def closest_star(self, my_box):
+        min_star = self.stars[0]
+        nearest, nearest_distance = self.star_index.nearest(my_box)
+        if nearest is not min_star and nearest_distance <= self.star_move_distance_threshold:
+            # walked over a later star of the route, reach it now instead of coming back
+            min_star = nearest
+        return min_star
 
     def remove_star(self, star):
         before = len(self.stars)
+        self.star_index.remove(star)
         self.stars.remove(star)
         self.info_set('Stars', len(self.stars))
         self.log_debug(f'removed star {before} -> {len(self.stars)}')
 
-    def find_my_location(self, screenshot=False):
+    def predict_my_location(self, heading=None):
+        now = time.time()
+        if self.my_location is None or self.tracker.should_locate(now):
+            return None
+        x, y = self.tracker.predict(now, heading)
+        w, h = self.my_location.width, self.my_location.height
+        return Box(int(x - w / 2), int(y - h / 2), w, h, name='predicted')
+
+    def find_my_location(self, screenshot=False, heading=None):
         frame = self.big_map_frame
         mat = self.get_box_by_name('box_minimap').crop_frame(self.frame)
-        # mask = create_circle_mask_with_hole(mat)
-        # mat = cv2.bitwise_and(mat, mat, mask=mask)
-
-        in_big_map = self.find_one(frame=frame, template=mat, threshold=0.05,
-                                   box=self.my_box, mask_function=create_circle_mask_with_hole,
-                                   screenshot=screenshot)
-        # in_big_maps = self.find_feature(frame=frame, template=mat, threshold=0.01, box=self.bounding_box)
-        if not in_big_map:
+        found = self.locator.locate(mat, mask=create_circle_mask_with_hole(mat),
+                                    center=self.tracker.hint(time.time(), heading))
+        if not found:
             raise RuntimeError('can not find my cords on big map!')
+        x, y, w, h, confidence = found
+        in_big_map = Box(x, y, w, h, name='in_big_map')
+        in_big_map.confidence = confidence
+        self.my_location = in_big_map
+        error = self.tracker.update(in_big_map.center(), time.time(), heading)
+        self.info_set('Tracker Error', round(error, 1))
         self.log_debug(f'found in_big_map: {in_big_map}')
         if self.debug and in_big_map:
             self.draw_boxes('stars', self.stars)
-            self.draw_boxes('my_box', self.my_box, color='green')
             self.draw_boxes('in_big_map', in_big_map, color='yellow')
             self.draw_boxes('me', in_big_map.scale(0.1), color='blue')
             # self.screenshot('box_minimap', frame=frame, show_box=True)
             # self.screenshot('template_minimap', frame=mat)
-        self.my_box = in_big_map.scale(1.25)
+        if screenshot:
+            self.screenshot('find_my_location', frame=frame, show_box=True)
         return in_big_map
 
-def create_circle_mask_with_hole(image):
-    """
-    Creates a binary circular mask with a rectangular hole in the center.
-    The circle fills the mask dimensions, and the hole is 1/4 width and height.
-    Args:
-        shape (tuple): The (height, width) of the desired mask.
-    Returns:
-        numpy.ndarray: A uint8 NumPy array representing the mask
-                       (255 in the circle ring, 0 elsewhere and in the hole).
-    """
-    h, w = image.shape[:2]
-    mask = np.zeros((h, w), dtype=np.uint8)
-    center_x, center_y = w // 2, h // 2
-    radius = min(w, h) // 2
-    # 1. Draw the outer filled white circle
-    cv2.circle(mask, (center_x, center_y), radius, 255, -1)
-    # 2. Calculate rectangle dimensions and corners for the hole
-    rect_w = round(w / 4.4)
-    rect_h = round(h / 4.4)
-    # Calculate top-left corner centered
-    rect_x1 = center_x - rect_w // 2
-    rect_y1 = center_y - rect_h // 2
-    # Calculate bottom-right corner
-    rect_x2 = rect_x1 + rect_w
-    rect_y2 = rect_y1 + rect_h
-    # 3. Draw the inner filled black rectangle (the hole)
-    # Use color=0 and thickness=-1 to fill with black
-    cv2.rectangle(mask, (rect_x1, rect_y1), (rect_x2, rect_y2), 0, -1)
-    return mask
-
 class FarmMapTask(BigMap):
 
     def __init__(self, *args, **kwargs):
@@ -201,10 +188,13 @@ class FarmMapTask(BigMap):
         self.stuck_keys = [['space', 0.02], ['a',2], ['d',2], ['t', 0.02]]
         self.stuck_index = 0
         self.last_distance = 0
-
-    @property
-    def star_move_distance_threshold(self):
-        return self.height_of_screen(0.03)
+        self.default_config.update({
+            'Heading Method': 'Template',
+        })
+        self.config_type['Heading Method'] = {'type': "drop_down", 'options': ['Template', 'Arrow Shape']}
+        self.config_description = {
+            'Heading Method': 'Template matches the rotated arrow, Arrow Shape computes it from the arrow outline, much faster',
+        }
 
     def run(self):
         self.stuck_index = 0
@@ -222,6 +212,7 @@ class FarmMapTask(BigMap):
         self.center_camera()
         current_adjust = None
         too_far_count = 0
+        predicted_distance = None
         while True:
             self.sleep(0.01)
             self.middle_click(interval=1, after_sleep=0.2)
@@ -231,18 +222,19 @@ class FarmMapTask(BigMap):
                     self.mouse_up(key='right')
                     self.send_key_up(current_direction)
                     current_direction = None
+                self.tracker.reset()
                 start = time.time()
                 self.combat_once()
                 duration = time.time() - start
                 if duration > 8:
-                    self.my_box = self.my_box.scale(1.1)
                     while True:
                         dropped, has_more = self.yolo_find_echo(use_color=False, walk=False)
                         self.incr_drop(dropped)
                         self.sleep(0.5)
                         if not dropped or not has_more:
                             break
-            star, distance, angle = self.find_direction_angle()
+            star, distance, angle, located = self.find_direction_angle(locate_unless_below=predicted_distance)
+            predicted_distance = None if located else distance
             # self.draw_boxes('next_star', star, color='green')
             if not star:
                 self.log_info('cannot find any stars, stop farming', notify=True)
@@ -250,6 +242,7 @@ class FarmMapTask(BigMap):
             if distance <= self.star_move_distance_threshold:
                 self.log_info(f'reached star {star} {distance} {self.star_move_distance_threshold}')
                 self.remove_star(star)
+                predicted_distance = None
                 continue
             elif distance >= self.height_of_screen(0.4):
                 too_far_count += 1
@@ -261,13 +254,15 @@ class FarmMapTask(BigMap):
                     break
                 else:
                     continue
-            elif distance == self.last_distance:
+            elif located and distance == self.last_distance:
                 logger.info(f'might be stuck, try {[self.stuck_index % 4]}')
                 self.send_key(self.stuck_keys[self.stuck_index % 4][0], down_time=self.stuck_keys[self.stuck_index % 4][1], after_sleep=0.5)
                 self.stuck_index += 1
+                self.tracker.reset()
                 continue
 
-            self.last_distance = distance
+            if located:
+                self.last_distance = distance
 
             if current_direction == 'w':
                 if 10 <= angle <= 80:
@@ -303,6 +298,7 @@ class FarmMapTask(BigMap):
                     self.send_key_up(current_direction)
                     self.sleep(0.2)
                 self.turn_direction(new_direction)
+                self.tracker.reset()
                 self.send_key_down('w')
                 self.sleep(0.2)
                 self.mouse_down(key='right')
@@ -337,36 +333,6 @@ star_color = {
 }
 
 
-def sort_stars(points, start_point, max_distance = 0):
-    """
-    BUILDS A PATH using Nearest Neighbor heuristic starting from 'start_point'.
-    Filters steps where distance < 'min_distance'. Prepends start_point.
-    NOTE: This is a HEURISTIC, likely NOT the absolute shortest total path.
-    """
-    unvisited = points[:]  # Copy the list of points to visit
-    if not unvisited:  # Handle empty input list
-        return []
-
-    path_result = []  # Initialize empty list for the results (excluding start)
-    current_point = start_point  # Start the calculation from start_point
-    while unvisited:
-        # Find points reachable according to min_distance
-        # If min_distance is 0, distance(..) >= 0 is always true for distinct points.
-        reachable_points = [p for p in unvisited if max_distance == 0 or current_point.center_distance(p) <= max_distance]
-        if not reachable_points:
-            # Stop if no remaining points meet the criteria (or if unvisited is empty)
-            # print(f"Stopping: No remaining points meet criteria from {current_point}.") # Optional debug
-            break
-            # Find the closest point among the reachable ones
-        next_point = min(reachable_points, key=lambda p: current_point.center_distance(p))
-
-        path_result.append(next_point)  # Add the chosen point to the result list
-        unvisited.remove(next_point)  # Mark as visited
-        current_point = next_point  # Update the current point for the next iteration
-    return path_result
-
-
-
 def mask_star(image):
     # return image
     return create_color_mask(image, star_color)
@@ -1,4 +1,3 @@
-import re
 import time
 
 from ok import Logger
@@ -36,8 +35,7 @@ class SkipBaseTask(BaseWWTask):
             return True
 
     def check_skip(self):
-        skip = self.ocr(0.03, 0.03, 0.11, 0.10, target_height=540, match=re.compile(r'SKIP|跳过', re.IGNORECASE),
-                        threshold=0.7)
+        skip = self.scene_state('dialog')
         if skip:
             logger.info('Click Skip Dialog')
             self.click_box(skip, move_back=True)
@@ -14,6 +14,6 @@ class AutoDialogTask(TriggerTask, SkipBaseTask):
         self.name = "Skip Dialog during Quests"
 
     def run(self):
-        if self.scene.in_team(self.in_team_and_world):
+        if self.scene_state('black') or self.scene_state('in_world') or self.scene_state('login'):
             return
         return self.check_skip()
@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+from ok import Box
+
+
+class BatchMatcher:
+    """
+    Matches several templates against one frame in a single pass: the union of all search
+    areas is cropped (and converted to grayscale) once, then every template is matched on its
+    own sub view of that shared crop, no per-feature crop or color conversion.
+    """
+
+    def __init__(self, method=cv2.TM_CCOEFF_NORMED):
+        self.method = method
+        self._gray_templates = {}
+
+    def gray_template(self, mat):
+        gray = self._gray_templates.get(id(mat))
+        if gray is None or gray[0] is not mat:
+            gray = (mat, cv2.cvtColor(mat, cv2.COLOR_BGR2GRAY) if mat.ndim == 3 else mat)
+            self._gray_templates[id(mat)] = gray
+        return gray[1]
+
+    def match(self, frame, targets, threshold, use_gray_scale=False):
+        """
+        Args:
+            frame (np.ndarray): The BGR frame.
+            targets (list): (name, search_box, template_mat, mask) tuples, mask may be None.
+            threshold (float): Minimum confidence of a match.
+            use_gray_scale (bool): Match in grayscale.
+
+        Returns:
+            (dict): name -> best matching Box, or None if below threshold.
+        """
+        frame_h, frame_w = frame.shape[:2]
+        left = max(0, min(box.x for _, box, _, _ in targets))
+        top = max(0, min(box.y for _, box, _, _ in targets))
+        right = min(frame_w, max(box.x + box.width for _, box, _, _ in targets))
+        bottom = min(frame_h, max(box.y + box.height for _, box, _, _ in targets))
+        shared = frame[top:bottom, left:right]
+        if use_gray_scale and shared.ndim == 3:
+            shared = cv2.cvtColor(shared, cv2.COLOR_BGR2GRAY)
+
+        results = {}
+        for name, box, mat, mask in targets:
+            if use_gray_scale:
+                mat = self.gray_template(mat)
+                if mask is not None and mask.ndim == 3:
+                    mask = mask[..., 0]
+            x = max(box.x, left) - left
+            y = max(box.y, top) - top
+            search = shared[y:min(box.y + box.height, bottom) - top, x:min(box.x + box.width, right) - left]
+            h, w = mat.shape[:2]
+            if search.shape[0] < h or search.shape[1] < w:
+                results[name] = None
+                continue
+            result = cv2.matchTemplate(search, mat, self.method, mask=mask)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            if not np.isfinite(max_val) or max_val < threshold:
+                results[name] = None
+                continue
+            found = Box(left + x + max_loc[0], top + y + max_loc[1], w, h)
+            found.confidence = max_val
+            found.name = name
+            results[name] = found
+        return results
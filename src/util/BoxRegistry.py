@@ -0,0 +1,39 @@
+from src.util.FrameCache import make_key
+
+
+class BoxRegistry:
+    """
+    Resolves named and screen relative boxes once per capture resolution. Each call gets its own copy
+    of the cached box, callers may move or resize it. Everything is dropped when the resolution changes.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.resolution = None
+        self.boxes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.resolution = None
+        self.boxes.clear()
+
+    def get(self, resolution, name, fun, args, kwargs):
+        if not self.enabled:
+            return fun(*args, **kwargs)
+        key = make_key(name, args, kwargs)
+        if key is None:
+            return fun(*args, **kwargs)
+        if resolution != self.resolution:
+            self.boxes.clear()
+            self.resolution = resolution
+        box = self.boxes.get(key)
+        if box is None:
+            self.misses += 1
+            box = fun(*args, **kwargs)
+            if box is not None:
+                self.boxes[key] = box.copy()
+        else:
+            self.hits += 1
+            box = box.copy()
+        return box
@@ -0,0 +1,92 @@
+import cv2
+
+
+class ColorPercentageEngine:
+    """
+    Color percentage of boxes with a summed area table per (frame, color range). Each color range remembers
+    the region its boxes were queried in, hud boxes stay at the same place from frame to frame. Once a color
+    range is queried more than build_after times on a frame and its queried boxes add up to build_area of
+    its region (the whole frame while the region is still growing, building costs about one query of it),
+    its mask is built for the region with its integral image and every later box query inside is four
+    lookups. The tables are dropped when the frame changes, the regions when the resolution changes.
+    """
+
+    def __init__(self, build_after=3, build_area=0.5):
+        self.enabled = True
+        self.build_after = build_after
+        self.build_area = build_area
+        self.frame = None
+        self.shape = None
+        self.regions = {}
+        self.grown = set()
+        self.queries = {}
+        self.tables = {}
+        self.table_queries = 0
+        self.direct_queries = 0
+        self.tables_built = 0
+
+    def clear(self):
+        self.frame = None
+        self.grown.clear()
+        self.queries.clear()
+        self.tables.clear()
+
+    def percentage(self, frame, color, box):
+        """
+        Args:
+            frame (np.ndarray): The BGR frame.
+            color (dict): 'r', 'g', 'b' -> (min, max), dicts with the same ranges share one table.
+            box (Box): The area, clipped to the frame.
+
+        Returns:
+            (float): Percentage of the box pixels in the color range, None if the box is outside the frame.
+        """
+        frame_h, frame_w = frame.shape[:2]
+        x1, y1 = max(0, box.x), max(0, box.y)
+        x2, y2 = min(frame_w, box.x + box.width), min(frame_h, box.y + box.height)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        if frame is not self.frame:
+            self.clear()
+            self.frame = frame
+            if frame.shape != self.shape:
+                self.shape = frame.shape
+                self.regions.clear()
+        key = color_key(color)
+        total = (x2 - x1) * (y2 - y1)
+        table = self.tables.get(key)
+        if table is not None:
+            rx, ry, table = table
+            if rx <= x1 and ry <= y1 and x2 - rx < table.shape[1] and y2 - ry < table.shape[0]:
+                self.table_queries += 1
+                x1, y1, x2, y2 = x1 - rx, y1 - ry, x2 - rx, y2 - ry
+                return (int(table[y2, x2]) - int(table[y1, x2]) - int(table[y2, x1]) + int(table[y1, x1])) / total
+        elif self.enabled:
+            count, area = self.queries.get(key, (0, 0))
+            count, area = count + 1, area + total
+            self.queries[key] = count, area
+            # a region known from earlier frames, else the whole frame
+            rx1, ry1, rx2, ry2 = self.regions[key] if key in self.regions and key not in self.grown \
+                else (0, 0, frame_w, frame_h)
+            if count > self.build_after and area >= self.build_area * (rx2 - rx1) * (ry2 - ry1):
+                # a 0/1 mask, the counts of a 4K frame would overflow int32 as 0/255
+                mask = cv2.inRange(frame[ry1:ry2, rx1:rx2], *bounds(key)) // 255
+                self.tables[key] = rx1, ry1, cv2.integral(mask, sdepth=cv2.CV_32S)
+                self.tables_built += 1
+                return self.percentage(frame, color, box)
+        region = self.regions.get(key)
+        grown = (x1, y1, x2, y2) if region is None else \
+            (min(region[0], x1), min(region[1], y1), max(region[2], x2), max(region[3], y2))
+        if grown != region:
+            self.regions[key] = grown
+            self.grown.add(key)
+        self.direct_queries += 1
+        return cv2.countNonZero(cv2.inRange(frame[y1:y2, x1:x2], *bounds(key))) / total
+
+
+def color_key(color):
+    return color['b'][0], color['g'][0], color['r'][0], color['b'][1], color['g'][1], color['r'][1]
+
+
+def bounds(key):
+    return key[:3], key[3:]
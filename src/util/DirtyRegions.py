@@ -0,0 +1,61 @@
+import time
+
+import cv2
+
+from src.util.FrameCache import copy_result
+
+
+class DirtyRegionTracker:
+    """
+    Predicates reuse their last result while the pixels of their region did not change. Each name keeps
+    a copy of the region it was computed on, a query compares only that region of the new frame, lazily,
+    and the region changed if any byte differs by more than tolerance. Hits and the time they saved are counted.
+    """
+
+    def __init__(self, tolerance=0):
+        self.enabled = True
+        self.tolerance = tolerance
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0
+
+    def clear(self):
+        self.results.clear()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+    def unchanged(self, frame, cached, rect):
+        cached_frame, cached_rect, roi = cached[:3]
+        if cached_rect != rect:
+            return False
+        if frame is cached_frame:
+            return True
+        x1, y1, x2, y2 = rect
+        return cv2.norm(frame[y1:y2, x1:x2], roi, cv2.NORM_INF) <= self.tolerance
+
+    def reuse(self, frame, name, box, fun):
+        """
+        Calls fun, or returns its last result under name if the pixels of box did not change since it was computed.
+        """
+        if not self.enabled or frame is None:
+            return fun()
+        height, width = frame.shape[:2]
+        rect = max(0, box.x), max(0, box.y), min(width, box.x + box.width), min(height, box.y + box.height)
+        if rect[2] <= rect[0] or rect[3] <= rect[1]:
+            return fun()
+        cached = self.results.get(name)
+        if cached is not None and self.unchanged(frame, cached, rect):
+            self.hits += 1
+            self.saved += cached[4]
+            return copy_result(cached[3])
+        self.misses += 1
+        start = time.perf_counter()
+        result = fun()
+        cost = time.perf_counter() - start
+        x1, y1, x2, y2 = rect
+        self.results[name] = (frame, rect, frame[y1:y2, x1:x2].copy(), copy_result(result), cost)
+        return result
@@ -0,0 +1,83 @@
+import re
+
+from ok import Box
+
+
+class FrameCache:
+    """
+    Memoizes pure per-frame queries (find_one, calculate_color_percentage, ocr...) by
+    (frame identity, function name, arguments). The cache holds a reference to its frame,
+    so the frame id can not be reused while cached, and everything is dropped when a new frame arrives.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.frame = None
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.frame = None
+        self.results.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+    def call(self, frame, name, fun, args, kwargs):
+        if not self.enabled or frame is None:
+            return fun(*args, **kwargs)
+        key = make_key(name, args, kwargs)
+        if key is None:
+            return fun(*args, **kwargs)
+        if frame is not self.frame:
+            self.results.clear()
+            self.frame = frame
+        if key in self.results:
+            self.hits += 1
+            return copy_result(self.results[key])
+        self.misses += 1
+        result = fun(*args, **kwargs)
+        self.results[key] = copy_result(result)
+        return result
+
+
+def make_key(name, args, kwargs):
+    try:
+        return name, freeze(args), freeze(tuple(sorted(kwargs.items())))
+    except Uncacheable:
+        return None
+
+
+class Uncacheable(Exception):
+    pass
+
+
+def freeze(value):
+    if value is None or isinstance(value, (str, int, float, bool, re.Pattern)):
+        return value
+    if isinstance(value, Box):
+        return 'Box', value.x, value.y, value.width, value.height, value.name
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple((k, freeze(v)) for k, v in sorted(value.items()))
+    # frames, templates, features, callables... can not be keyed safely
+    raise Uncacheable()
+
+
+def copy_result(result):
+    # callers mutate returned boxes (draw confidence, offsets), never hand out the cached instance
+    if isinstance(result, Box):
+        return result.copy()
+    if isinstance(result, list):
+        return [copy_result(r) for r in result]
+    if isinstance(result, dict):
+        return {k: copy_result(v) for k, v in result.items()}
+    return result
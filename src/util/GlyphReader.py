@@ -0,0 +1,127 @@
+import cv2
+import numpy as np
+
+glyph_size = 20
+
+
+class GlyphReader:
+    """
+    Reads text in a fixed game font, like stamina or countdown numbers, by matching its glyphs against
+    templates learned from earlier confident ocr of the same text. Glyphs are the bright components of
+    the crop, each placed in a square of the line metrics so '1', '.' and '/' keep their size and position.
+    Templates are kept per resolution, with up to max_variants per character.
+    """
+
+    def __init__(self, threshold=180, min_score=0.8, max_variants=3, verify_every=20):
+        self.threshold = threshold
+        self.min_score = min_score
+        self.max_variants = max_variants
+        self.verify_every = verify_every
+        self.templates = {}
+        self.reads = 0
+        self.template_reads = 0
+        self.fallbacks = 0
+        self.verified = 0
+        self.agreed = 0
+
+    @property
+    def accuracy(self):
+        return self.agreed / self.verified if self.verified else 0
+
+    def should_verify(self):
+        return self.verify_every > 0 and self.template_reads % self.verify_every == 0
+
+    def bright(self, image):
+        """
+        Returns:
+            (np.ndarray): uint8 mask, 255 for the pixels bright enough to be text.
+        """
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)[1]
+
+    def glyphs(self, image):
+        """
+        Returns:
+            (np.ndarray): (n, glyph_size, glyph_size) float32 glyphs from left to right.
+        """
+        mask = self.bright(image)
+        num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if num_labels < 2:
+            return np.zeros((0, glyph_size, glyph_size), dtype=np.float32)
+        stats = stats[1:]
+        # merge components overlapping horizontally, like the two parts of a broken glyph
+        order = np.argsort(stats[:, cv2.CC_STAT_LEFT])
+        rects = []
+        for x, y, w, h in stats[order, :4]:
+            if rects and x < rects[-1][0] + rects[-1][2]:
+                px, py, pw, ph = rects[-1]
+                rects[-1] = (px, min(py, y), max(px + pw, x + w) - px, max(py + ph, y + h) - min(py, y))
+            else:
+                rects.append((x, y, w, h))
+        # the median glyph sets the line metrics, so a taller '/' does not rescale the digits around it
+        line_height = max(1, int(np.median([h for _, _, _, h in rects])))
+        line_top = int(np.median([y for _, y, _, _ in rects])) - line_height // 4
+        cell_height = line_height * 3 // 2
+        glyphs = np.zeros((len(rects), glyph_size, glyph_size), dtype=np.float32)
+        for i, (x, y, w, h) in enumerate(rects):
+            cell = np.zeros((cell_height, max(cell_height, w)), dtype=np.uint8)
+            y1, y2 = max(y, line_top), min(y + h, line_top + cell_height)
+            if y2 > y1:
+                cell[y1 - line_top:y2 - line_top, :w] = mask[y1:y2, x:x + w]
+            glyphs[i] = cv2.resize(cell, (glyph_size, glyph_size), interpolation=cv2.INTER_AREA) / 255
+        return glyphs
+
+    def learn(self, image, text, resolution):
+        """
+        Stores the glyphs of image as templates of text, when they can be paired one to one.
+
+        Returns:
+            (bool): If the glyphs were learned.
+        """
+        text = text.replace(' ', '')
+        glyphs = self.glyphs(image)
+        if not text or len(glyphs) != len(text):
+            return False
+        templates = self.templates.setdefault(resolution, {})
+        for char, glyph in zip(text, glyphs):
+            variants = templates.setdefault(char, [])
+            if all(glyph_scores(glyph, variant) < 0.95 for variant in variants):
+                variants.append(glyph)
+                del variants[:-self.max_variants]
+        return True
+
+    def read(self, image, resolution):
+        """
+        Returns:
+            (str, float): The text and the worst glyph score, None if a glyph is unknown or scores below min_score.
+        """
+        self.reads += 1
+        templates = self.templates.get(resolution)
+        if not templates:
+            return None
+        glyphs = self.glyphs(image)
+        if len(glyphs) == 0:
+            return None
+        chars = [char for char, variants in templates.items() for _ in variants]
+        stack = np.stack([variant for variants in templates.values() for variant in variants])
+        scores = glyph_scores(glyphs[:, None], stack[None])
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(glyphs)), best]
+        score = float(best_scores.min())
+        if score < self.min_score:
+            return None
+        self.template_reads += 1
+        return ''.join(chars[i] for i in best), score
+
+    def verify(self, template_text, ocr_text):
+        self.verified += 1
+        if template_text == ocr_text.replace(' ', ''):
+            self.agreed += 1
+            return True
+        return False
+
+
+def glyph_scores(a, b):
+    # soft jaccard, the empty cell background does not count as a match
+    union = np.maximum(a, b).sum(axis=(-2, -1))
+    return np.minimum(a, b).sum(axis=(-2, -1)) / np.maximum(union, 1e-6)
@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+
+class LineRecognizer:
+    """
+    Recognition only rapidocr for small known single line regions: text detection is skipped, every
+    crop is read as one line and several crops share one batched call to the recognizer of engine.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    @property
+    def available(self):
+        # only rapidocr exposes its recognizer
+        return hasattr(self.engine, 'text_rec')
+
+    def recognize(self, images):
+        """
+        Args:
+            images: BGR crops, each holding one tight line of text.
+
+        Returns:
+            (list): (text, score) for every crop.
+        """
+        from rapidocr.ch_ppocr_rec import TextRecInput
+        if not images:
+            return []
+        output = self.engine.text_rec(TextRecInput(img=list(images)))
+        return [(text.strip(), float(score)) for text, score in zip(output.txts, output.scores)]
+
+
+def bright_component_rect(image, threshold=200):
+    """
+    Bounding rect (x, y, w, h) of the biggest bright component of the image, like the frame of a key hint,
+    None if there is none.
+    """
+    _, mask = cv2.threshold(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), threshold, 255, cv2.THRESH_BINARY)
+    num_labels, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if num_labels < 2:
+        return None
+    label = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    return tuple(int(v) for v in stats[label, :4])
@@ -0,0 +1,49 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+class OcrCache:
+    """
+    LRU cache of ocr results keyed by a blake2b hash of the ROI pixels and the ocr arguments,
+    a text box that did not change between frames costs a hash instead of an inference.
+    """
+
+    def __init__(self, max_size=256):
+        self.enabled = True
+        self.max_size = max_size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.results.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+    def get(self, key):
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+
+def roi_hash(image):
+    return image.shape, hashlib.blake2b(np.ascontiguousarray(image).data, digest_size=16).digest()
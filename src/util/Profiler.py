@@ -0,0 +1,106 @@
+import functools
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from ok import Logger
+
+logger = Logger.get_logger(__name__)
+
+
+class RollingStats:
+    """
+    The last window durations of one call site, and their call times for the call rate.
+    """
+
+    def __init__(self, window=1000):
+        self.durations = deque(maxlen=window)
+        self.times = deque(maxlen=window)
+        self.calls = 0
+
+    def add(self, now, duration):
+        self.durations.append(duration)
+        self.times.append(now)
+        self.calls += 1
+
+    def calls_per_second(self, now):
+        if len(self.times) < 2:
+            return 0.0
+        return len(self.times) / max(now - self.times[0], 1e-6)
+
+    def report(self, now):
+        p50, p95, p99 = np.percentile(self.durations, (50, 95, 99)) * 1000
+        return {
+            'calls': self.calls,
+            'calls_per_second': round(self.calls_per_second(now), 2),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+        }
+
+
+class Profiler:
+    """
+    Rolling latency of the hot path predicates per (task, function), only a flag check when disabled.
+    """
+
+    def __init__(self, window=1000):
+        self.enabled = False
+        self.window = window
+        self.stats = {}
+
+    def reset(self):
+        self.stats.clear()
+
+    def record(self, task, name, duration):
+        key = task, name
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = RollingStats(self.window)
+        stats.add(time.time(), duration)
+
+    def report(self):
+        """
+        Returns:
+            (dict): 'task.function' -> calls, calls_per_second and p50/p95/p99 in ms, slowest p95 first.
+        """
+        now = time.time()
+        reports = {f'{task}.{name}': stats.report(now) for (task, name), stats in self.stats.items()}
+        return dict(sorted(reports.items(), key=lambda item: item[1]['p95_ms'], reverse=True))
+
+    def update_info(self, info):
+        for name, report in self.report().items():
+            info[f'{name} ms'] = (f"{report['p50_ms']:.2f}/{report['p95_ms']:.2f}/{report['p99_ms']:.2f} "
+                                  f"{report['calls_per_second']:.1f}/s")
+
+    def dump(self, path=os.path.join('logs', 'profile.json')):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        logger.info(f'profile dumped to {path}')
+        return path
+
+
+profiler = Profiler()
+
+
+def profiled(fun):
+    """
+    Times every call of a task method into the profiler, keyed by the task class and method name.
+    """
+    name = fun.__name__
+
+    @functools.wraps(fun)
+    def wrapper(self, *args, **kwargs):
+        if not profiler.enabled:
+            return fun(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fun(self, *args, **kwargs)
+        finally:
+            profiler.record(type(self).__name__, name, time.perf_counter() - start)
+
+    return wrapper
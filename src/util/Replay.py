@@ -0,0 +1,259 @@
+import os
+import re
+import time
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from ok import BaseCaptureMethod, DoNothingInteraction, Logger, og
+
+logger = Logger.get_logger(__name__)
+
+image_extensions = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+class ReplayFinished(Exception):
+    pass
+
+
+class ReplayCaptureMethod(BaseCaptureMethod):
+    """
+    Feeds recorded frames from a directory of images or a video file. In realtime mode every frame is
+    served from its recorded timestamp on, a slow loop skips frames like it would on the live game,
+    otherwise each get_frame steps to the next frame. Image timestamps are the milliseconds in the file
+    name when they are all numbers, else frames are 1 / fps apart. After the last frame it is finished and
+    keeps serving the last frame, get_frame never raises into the capture loop of ok.
+    """
+    name = "Replay"
+    description = "replay recorded frames"
+
+    def __init__(self, exit_event, path, realtime=True, fps=30, clock=time.time):
+        super().__init__()
+        self.exit_event = exit_event
+        self.path = path
+        self.realtime = realtime
+        self.fps = fps
+        self.clock = clock
+        self.video = None
+        self.files = []
+        self.timestamps = []
+        if os.path.isdir(path):
+            self.files = sorted((f for f in os.listdir(path) if f.lower().endswith(image_extensions)),
+                                key=natural_key)
+            self.timestamps = file_timestamps(self.files, fps)
+        else:
+            self.video = cv2.VideoCapture(path)
+            if not self.video.isOpened():
+                raise ValueError(f'can not open replay {path}')
+        self.start = None
+        self.index = -1
+        self.frame = None
+        self.frame_time = None
+        self.pending = None
+        self.frames_served = 0
+        self.finished = False
+
+    def connected(self):
+        return not self.finished
+
+    def close(self):
+        if self.video is not None:
+            self.video.release()
+            self.video = None
+
+    def elapsed(self):
+        if self.start is None:
+            self.start = self.clock()
+        return self.clock() - self.start
+
+    def do_get_frame(self):
+        if self.frame is None and self.pending is None:
+            self.pending = self._read()
+        if self.realtime:
+            elapsed = self.elapsed()
+            while self.pending is not None and (self.frame is None or self.pending[1] <= elapsed):
+                self._take()
+            if self.pending is None and (self.frame is None or elapsed >= self.frame_time + 1 / self.fps):
+                self.finished = True
+        elif self.pending is not None:
+            self._take()
+        else:
+            self.finished = True
+        return self.frame
+
+    def _take(self):
+        self.frame, self.frame_time = self.pending
+        self.frames_served += 1
+        self.pending = self._read()
+
+    def _read(self):
+        """
+        Returns:
+            (np.ndarray, float): The next frame and its timestamp in seconds, None at the end.
+        """
+        if self.video is not None:
+            success, frame = self.video.read()
+            if not success:
+                return None
+            self.index += 1
+            return frame, self.video.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        if self.index + 1 >= len(self.files):
+            return None
+        self.index += 1
+        return cv2.imread(os.path.join(self.path, self.files[self.index])), self.timestamps[self.index]
+
+
+class Action(NamedTuple):
+    time: float
+    name: str
+    args: tuple
+
+
+class RecordingInteraction(DoNothingInteraction):
+    """
+    Records every input the task sends instead of sending it.
+    """
+
+    def __init__(self, capture):
+        super().__init__(capture)
+        self.actions = []
+
+    def record(self, name, *args):
+        self.actions.append(Action(time.time(), name, args))
+
+    def send_key(self, key, down_time=0.02):
+        self.record('send_key', key, down_time)
+
+    def send_key_down(self, key):
+        self.record('send_key_down', key)
+
+    def send_key_up(self, key):
+        self.record('send_key_up', key)
+
+    def move(self, x, y):
+        self.record('move', x, y)
+
+    def swipe(self, from_x, from_y, to_x, to_y, duration, settle_time=0):
+        self.record('swipe', from_x, from_y, to_x, to_y, duration)
+
+    def click(self, x=-1, y=-1, move_back=False, name=None, down_time=0.05):
+        self.record('click', x, y, name)
+
+    def right_click(self, x=-1, y=-1, move_back=False, name=None):
+        self.record('right_click', x, y, name)
+
+    def middle_click(self, x=-1, y=-1, move_back=False, name=None, down_time=0.05):
+        self.record('middle_click', x, y, name)
+
+    def mouse_down(self, x=-1, y=-1, name=None, key="left"):
+        self.record('mouse_down', x, y, key)
+
+    def mouse_up(self, key="left"):
+        self.record('mouse_up', key)
+
+    def scroll(self, x, y, scroll_amount):
+        self.record('scroll', x, y, scroll_amount)
+
+    def counts(self):
+        return count_actions(self.actions)
+
+
+class ReplayReport(NamedTuple):
+    duration: float
+    frames: int
+    latencies: list
+    actions: list
+
+    @property
+    def iterations(self):
+        return len(self.latencies)
+
+    def latency(self, percentile):
+        return float(np.percentile(self.latencies, percentile)) if self.latencies else 0.0
+
+    def summary(self):
+        return {
+            'Duration': round(self.duration, 3),
+            'Frames': self.frames,
+            'Iterations': self.iterations,
+            'Latency p50 ms': round(self.latency(50) * 1000, 2),
+            'Latency p95 ms': round(self.latency(95) * 1000, 2),
+            'Latency Max ms': round(max(self.latencies, default=0) * 1000, 2),
+            'Actions': count_actions(self.actions),
+        }
+
+
+class ReplayHarness:
+    """
+    Runs a task headless against a replay: the device capture and interaction are swapped for a
+    ReplayCaptureMethod and a RecordingInteraction while fun runs, and the time between the task's
+    next_frame calls is recorded as the loop latency. Runs until fun returns or the frames run out, the
+    task's next_frame then raises ReplayFinished, from the task thread and not from ok's capture.
+    """
+
+    def __init__(self, task, path, realtime=True, fps=30):
+        self.task = task
+        self.capture = ReplayCaptureMethod(og.device_manager.exit_event, path, realtime=realtime, fps=fps)
+        self.interaction = RecordingInteraction(self.capture)
+
+    def run(self, fun=None, *args, **kwargs):
+        """
+        Args:
+            fun: Task method to run, defaults to task.run.
+
+        Returns:
+            ReplayReport: Latency of every loop iteration, frames consumed and actions emitted.
+        """
+        fun = fun or self.task.run
+        device_manager = og.device_manager
+        capture_method, interaction = device_manager.capture_method, device_manager.interaction
+        device_manager.capture_method, device_manager.interaction = self.capture, self.interaction
+        latencies = []
+        last = None
+        task_next_frame = self.task.next_frame
+
+        def next_frame():
+            nonlocal last
+            now = time.time()
+            if last is not None:
+                latencies.append(now - last)
+            frame = task_next_frame()
+            if self.capture.finished:
+                raise ReplayFinished(f'replay finished after {self.capture.frames_served} frames')
+            last = time.time()
+            return frame
+
+        self.task.next_frame = next_frame
+        start = time.time()
+        try:
+            fun(*args, **kwargs)
+        except ReplayFinished as e:
+            logger.info(str(e))
+        finally:
+            del self.task.next_frame
+            device_manager.capture_method, device_manager.interaction = capture_method, interaction
+            self.capture.close()
+        report = ReplayReport(time.time() - start, self.capture.frames_served, latencies,
+                              list(self.interaction.actions))
+        logger.info(f'replay {self.capture.path} {report.summary()}')
+        return report
+
+
+def count_actions(actions):
+    counts = {}
+    for action in actions:
+        counts[action.name] = counts.get(action.name, 0) + 1
+    return counts
+
+
+def natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def file_timestamps(files, fps):
+    stems = [os.path.splitext(f)[0] for f in files]
+    if stems and all(stem.isdigit() for stem in stems):
+        first = int(stems[0])
+        return [(int(stem) - first) / 1000 for stem in stems]
+    return [i / fps for i in range(len(files))]
@@ -0,0 +1,273 @@
+"""
+Latency benchmark of the vision primitives on tests/images scaled to 720p, 1080p and 4K.
+
+    python tests/Benchmark.py --update          # save the baseline of this machine
+    python tests/Benchmark.py --tolerance 0.2   # exit 1 if a primitive got 20% slower than the baseline, or without one
+
+The task methods run on a task set up by ok's TaskTestCase like in game: check_health_bar, count_rings
+and con_rings on an AutoCombatTask, rotate_arrow_and_find and estimate_heading on a FarmMapTask. The
+helpers they call are timed standalone as well, the *_helper micro benchmarks.
+Primitives that can not be set up here (ok on Linux, openvino, a missing model) are reported as skipped.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+resolutions = [(1280, 720), (1920, 1080), (3840, 2160)]
+default_baseline = os.path.join('tests', 'benchmark_baseline.json')
+
+
+def load_frames(width, height):
+    frames = []
+    for path in sorted(glob.glob(os.path.join('tests', 'images', '*.png'))):
+        image = cv2.imread(path)
+        if image.shape[0] < 720:
+            continue
+        frames.append(cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA))
+    return frames
+
+
+def crop_4k(frame, x1, y1, x2, y2):
+    # coordinates at 3840x2160, like box_of_screen_scaled
+    scale = frame.shape[0] / 2160
+    return frame[round(y1 * scale):round(y2 * scale), round(x1 * scale):round(x2 * scale)]
+
+
+def minimap_crop(frame):
+    return crop_4k(frame, 136, 122, 376, 362)
+
+
+def arrow_template(height):
+    # the 'arrow' feature is cut from assets/images/59.png, a 4K screenshot
+    image = cv2.imread(os.path.join('assets', 'images', '59.png'))
+    image = cv2.resize(image, (round(height * 16 / 9), height), interpolation=cv2.INTER_AREA)
+    return crop_4k(image, 200, 188, 312, 300).copy()
+
+
+_task_cases = {}
+
+
+def task_case(task_class_name):
+    """
+    A test case of ok for the task class in src.task, created once per class, its task runs the hot path
+    methods like in game.
+    """
+    case = _task_cases.get(task_class_name)
+    if case is None:
+        import importlib
+        from ok.test.TaskTestCase import TaskTestCase
+        from config import config
+
+        class BenchmarkCase(TaskTestCase):
+            task_class = getattr(importlib.import_module(f'src.task.{task_class_name}'), task_class_name)
+
+            def runTest(self):
+                pass
+
+        BenchmarkCase.config = config
+        BenchmarkCase.setUpClass()
+        case = _task_cases[task_class_name] = BenchmarkCase()
+        case.setUp()
+    return case
+
+
+class TaskMethod:
+    """
+    Times a method of the task on each frame, the frame is set by prepare outside of the timing.
+    """
+
+    def __init__(self, method, task_class_name='AutoCombatTask'):
+        self.case = task_case(task_class_name)
+        self.method = method
+        self.paths = {}
+        self.folder = tempfile.mkdtemp(prefix='benchmark_')
+
+    def prepare(self, frame):
+        path = self.paths.get(id(frame))
+        if path is None:
+            path = os.path.join(self.folder, f'{len(self.paths)}.png')
+            cv2.imwrite(path, frame)
+            self.paths[id(frame)] = path
+        self.case.set_image(path)
+        self.case.task.next_frame()
+
+    def __call__(self, frame):
+        return self.method(self.case.task)
+
+
+def check_health_bar(width, height):
+    def run(task):
+        task.do_reset_to_false()
+        return task.check_health_bar()
+
+    return TaskMethod(run)
+
+
+def count_rings(width, height):
+    from src.combat.ConRing import con_colors
+    min_area = 1500 / 3840 / 2160 * width * height
+
+    def run(task):
+        image = task.con_box().crop_frame(task.frame)
+        return [task.count_rings(image, color, min_area) for color in con_colors]
+
+    return TaskMethod(run)
+
+
+def con_rings(width, height):
+    def run(task):
+        return task.analyze_con_rings()
+
+    return TaskMethod(run)
+
+
+def rotate_arrow_and_find(width, height):
+    def run(task):
+        return task.rotate_arrow_and_find()
+
+    return TaskMethod(run, 'FarmMapTask')
+
+
+def estimate_heading(width, height):
+    def run(task):
+        return task.get_my_angle('Arrow Shape')
+
+    return TaskMethod(run, 'FarmMapTask')
+
+
+def con_rings_helper(width, height):
+    from src.combat.ConRing import ConRingAnalyzer
+    analyzer = ConRingAnalyzer()
+    min_area = 1500 / 3840 / 2160 * width * height
+
+    def run(frame):
+        return analyzer.analyze(crop_4k(frame, 1422, 1939, 1566, 2076), min_area)
+
+    return run
+
+
+def rotate_arrow_and_find_helper(width, height):
+    from src.map.ArrowTemplateBank import ArrowTemplateBank
+    bank = ArrowTemplateBank(arrow_template(height))
+
+    def run(frame):
+        return bank.search(minimap_crop(frame))
+
+    return run
+
+
+def estimate_heading_helper(width, height):
+    from src.map.ArrowHeading import estimate_heading as estimate
+
+    def run(frame):
+        return estimate(minimap_crop(frame))
+
+    return run
+
+
+def yolo_detect(width, height):
+    from src.OpenVinoYolo8Detect import OpenVinoYolo8Detect
+    model = OpenVinoYolo8Detect(weights=os.path.join('assets', 'yolo', 'echo.onnx'))
+
+    def run(frame):
+        return model.detect(frame, threshold=0.6)
+
+    return run
+
+
+primitives = [check_health_bar, count_rings, con_rings, rotate_arrow_and_find, estimate_heading, yolo_detect,
+              con_rings_helper, rotate_arrow_and_find_helper, estimate_heading_helper]
+
+
+def time_primitive(run, frames, repeat):
+    prepare = getattr(run, 'prepare', None)
+    for frame in frames:
+        if prepare:
+            prepare(frame)
+        run(frame)
+    costs = []
+    for _ in range(repeat):
+        for frame in frames:
+            if prepare:
+                prepare(frame)
+            start = time.perf_counter()
+            run(frame)
+            costs.append(time.perf_counter() - start)
+    return float(np.median(costs)) * 1000
+
+
+def run_benchmarks(repeat, names=None):
+    """
+    Returns:
+        (dict): 'primitive@WxH' -> median latency in ms, None if the primitive can not run here.
+    """
+    results = {}
+    for width, height in resolutions:
+        frames = load_frames(width, height)
+        for primitive in primitives:
+            if names and primitive.__name__ not in names:
+                continue
+            key = f'{primitive.__name__}@{width}x{height}'
+            try:
+                run = primitive(width, height)
+            except Exception as e:
+                # missing dependency or model file
+                print(f'{key:40} skipped: {e!r}')
+                results[key] = None
+                continue
+            results[key] = round(time_primitive(run, frames, repeat), 3)
+            print(f'{key:40} {results[key]:10.3f} ms')
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """
+    Returns:
+        (list): 'primitive@WxH' of the results slower than baseline * (1 + tolerance) by more than min_delta ms.
+    """
+    regressions = []
+    for key, cost in results.items():
+        base = baseline.get(key)
+        if cost is None or base is None:
+            continue
+        if cost > base * (1 + tolerance) and cost - base > min_delta:
+            regressions.append(key)
+            print(f'{key:40} regressed {base:.3f} -> {cost:.3f} ms')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vision primitives against tests/images')
+    parser.add_argument('--baseline', default=default_baseline)
+    parser.add_argument('--update', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown ratio')
+    parser.add_argument('--min-delta', type=float, default=0.1, help='ignore slowdowns below this many ms')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--only', nargs='*', help='primitive names to run')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat, args.only)
+    if args.update:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f'baseline saved to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline} to compare with, run with --update first')
+        return 1
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    return 1 if compare(results, baseline, args.tolerance, args.min_delta) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import time
+import unittest
+
+import math
+
+import cv2
+import numpy as np
+
+from ok import Logger
+from src.map.ArrowHeading import estimate_heading
+from src.map.ArrowTemplateBank import ArrowTemplateBank, get_arrow_bank
+
+logger = Logger.get_logger(__name__)
+
+
+def legacy_rotate_and_find(image, original_mat):
+    # the original loop, rotating and matching every angle on each call
+    (h, w) = original_mat.shape[:2]
+    center = (w // 2, h // 2)
+    max_conf = 0
+    max_angle = 0
+    for angle in range(0, 360):
+        rotation_matrix = cv2.getRotationMatrix2D(center, -angle, 1.0)
+        template = cv2.warpAffine(original_mat, rotation_matrix, (w, h))
+        _, conf, _, _ = cv2.minMaxLoc(cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED))
+        if conf > max_conf:
+            max_conf = conf
+            max_angle = angle
+    return max_angle
+
+
+def draw_arrow(angle, size=56):
+    # a yellow chevron with a white inside, pointing angle degrees clockwise from east, on the minimap gray
+    image = np.full((size, size, 3), (70, 75, 80), dtype=np.uint8)
+    shape = np.array([[20, 0], [-14, -16], [-6, 0], [-14, 16]], dtype=np.float64)
+    inner = np.array([[12, 0], [-8, -8], [-3, 0], [-8, 8]], dtype=np.float64)
+    rad = math.radians(angle)
+    rotation = np.array([[math.cos(rad), -math.sin(rad)], [math.sin(rad), math.cos(rad)]])
+    for points, color in ((shape, (40, 210, 240)), (inner, (230, 250, 255))):
+        points = points @ rotation.T + size / 2
+        cv2.fillPoly(image, [np.round(points * 16).astype(np.int32)], color, lineType=cv2.LINE_AA, shift=4)
+    return image
+
+
+def angle_diff(a, b):
+    diff = abs(a - b) % 360
+    return min(diff, 360 - diff)
+
+
+class TestArrow(unittest.TestCase):
+
+    def setUp(self):
+        # the 'arrow' feature is cut from assets/images/59.png (3840x2160), scaled to 1080p like the feature loader does
+        image = cv2.imread('assets/images/59.png')
+        image = cv2.resize(image, (1920, 1080), interpolation=cv2.INTER_AREA)
+        self.template = image[94:150, 100:156].copy()
+        # the minimap around the arrow, rotated around the arrow to fake other headings
+        self.scene = cv2.imread('tests/images/mini_map.png')[61:181, 68:188].copy()
+
+    def rotated_scene(self, angle):
+        h, w = self.scene.shape[:2]
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), -angle, 1.0)
+        return cv2.warpAffine(self.scene, matrix, (w, h), borderMode=cv2.BORDER_REPLICATE)
+
+    def test_same_angle_as_exhaustive(self):
+        bank = ArrowTemplateBank(self.template)
+        for angle in range(0, 360, 23):
+            scene = self.rotated_scene(angle)
+            exhaustive, _, _ = bank.search(scene, coarse_step=1, refine=0)
+            found, _, _ = bank.search(scene)
+            self.assertLessEqual(angle_diff(exhaustive, found), 1, f'rotated {angle}')
+            self.assertEqual(legacy_rotate_and_find(scene, self.template), exhaustive)
+
+    def test_masked_same_angle_as_exhaustive(self):
+        bank = ArrowTemplateBank(self.template, with_mask=True)
+        for angle in range(0, 360, 37):
+            scene = self.rotated_scene(angle)
+            exhaustive, _, _ = bank.search(scene, coarse_step=1, refine=0)
+            found, _, _ = bank.search(scene)
+            self.assertLessEqual(angle_diff(exhaustive, found), 1, f'rotated {angle}')
+
+    def test_latency(self):
+        scene = self.rotated_scene(130)
+        start = time.perf_counter()
+        bank = get_arrow_bank(self.template)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(10):
+            legacy_rotate_and_find(scene, self.template)
+        legacy = (time.perf_counter() - start) / 10
+        start = time.perf_counter()
+        for _ in range(10):
+            bank.search(scene)
+        fast = (time.perf_counter() - start) / 10
+        self.assertIs(bank, get_arrow_bank(self.template))
+        logger.info(f'arrow angle build {build * 1000:.2f}ms legacy {legacy * 1000:.2f}ms bank {fast * 1000:.2f}ms')
+        self.assertLess(fast, legacy)
+
+    def test_heading_synthetic(self):
+        for angle in range(0, 360, 7):
+            found, _ = estimate_heading(draw_arrow(angle))
+            self.assertLessEqual(angle_diff(angle, found), 2, f'drawn {angle}')
+
+    def test_heading_same_as_template(self):
+        bank = ArrowTemplateBank(self.template)
+        for angle in range(0, 360, 23):
+            scene = self.rotated_scene(angle)
+            found, _ = estimate_heading(scene)
+            template_angle, _, _ = bank.search(scene)
+            self.assertLessEqual(angle_diff(template_angle, found), 5, f'rotated {angle}')
+
+    def test_heading_latency(self):
+        scene = self.rotated_scene(130)
+        start = time.perf_counter()
+        for _ in range(100):
+            estimate_heading(scene)
+        cost = (time.perf_counter() - start) / 100
+        logger.info(f'arrow shape heading {cost * 1000:.3f}ms')
+        self.assertLess(cost, 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()
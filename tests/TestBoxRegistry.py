@@ -0,0 +1,67 @@
+import unittest
+
+from ok import Box
+from src.util.BoxRegistry import BoxRegistry
+
+
+class FakeScreen:
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.calls = 0
+
+    def box_of_screen(self, x, y, to_x, to_y, name=None):
+        self.calls += 1
+        return Box(x * self.width, y * self.height, to_x=to_x * self.width, to_y=to_y * self.height, name=name)
+
+    def get_box_by_name(self, name):
+        self.calls += 1
+        return None if name == 'missing' else Box(0, 0, self.width, self.height, name=name)
+
+
+class TestBoxRegistry(unittest.TestCase):
+
+    def get(self, registry, screen, *args, **kwargs):
+        return registry.get((screen.width, screen.height), 'box_of_screen', screen.box_of_screen, args, kwargs)
+
+    def test_resolved_once_per_resolution(self):
+        registry = BoxRegistry()
+        screen = FakeScreen(1920, 1080)
+        box = self.get(registry, screen, 0.1, 0.1, 0.9, 0.9, name='target_area_box')
+        self.assertEqual(box, self.get(registry, screen, 0.1, 0.1, 0.9, 0.9, name='target_area_box'))
+        self.assertEqual('other', self.get(registry, screen, 0.1, 0.1, 0.9, 0.9, name='other').name)
+        self.assertEqual(2, screen.calls)
+        self.assertEqual(1, registry.hits)
+
+        screen.width, screen.height = 3840, 2160
+        scaled = self.get(registry, screen, 0.1, 0.1, 0.9, 0.9, name='target_area_box')
+        self.assertEqual(384, scaled.x)
+        self.assertEqual(3, screen.calls)
+
+    def test_mutation_not_shared(self):
+        registry = BoxRegistry()
+        screen = FakeScreen(1920, 1080)
+        for _ in range(2):
+            box = self.get(registry, screen, 0.1, 0.1, 0.9, 0.9, name='boss_health')
+            self.assertEqual((192, 108, 1536), (box.x, box.y, box.width))
+            box.width = 10
+            box.x += 6
+        self.assertEqual(1, screen.calls)
+
+    def test_missing_not_cached(self):
+        registry = BoxRegistry()
+        screen = FakeScreen(1920, 1080)
+        for _ in range(2):
+            self.assertIsNone(registry.get((1920, 1080), 'get_box_by_name', screen.get_box_by_name, ('missing',), {}))
+        self.assertEqual(2, screen.calls)
+
+    def test_disabled(self):
+        registry = BoxRegistry()
+        registry.enabled = False
+        screen = FakeScreen(1920, 1080)
+        self.assertIsNot(self.get(registry, screen, 0, 0, 1, 1), self.get(registry, screen, 0, 0, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
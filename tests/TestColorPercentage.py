@@ -0,0 +1,119 @@
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from ok import Box, Logger
+from src.combat.ConRing import con_colors
+from src.util.ColorPercentage import ColorPercentageEngine, color_key
+
+logger = Logger.get_logger(__name__)
+
+white_color = {
+    'r': (253, 255),  # Red range
+    'g': (253, 255),  # Green range
+    'b': (253, 255)  # Blue range
+}
+
+
+def legacy_percentage(image, color, box):
+    image = image[box.y:box.y + box.height, box.x:box.x + box.width]
+    mask = cv2.inRange(image, (color['b'][0], color['g'][0], color['r'][0]),
+                       (color['b'][1], color['g'][1], color['r'][1]))
+    return cv2.countNonZero(mask) / (image.size / 3)
+
+
+def random_boxes(frame, count, seed):
+    rng = np.random.default_rng(seed)
+    height, width = frame.shape[:2]
+    boxes = []
+    for _ in range(count):
+        w, h = rng.integers(1, 200, 2)
+        x, y = rng.integers(0, width - w), rng.integers(0, height - h)
+        boxes.append(Box(int(x), int(y), int(w), int(h)))
+    return boxes
+
+
+class TestColorPercentage(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = cv2.imread('tests/images/in_combat.png')
+
+    def test_same_as_legacy(self):
+        engine = ColorPercentageEngine(build_after=2, build_area=0)
+        for color in con_colors + [white_color]:
+            for box in random_boxes(self.frame, 20, 1):
+                self.assertAlmostEqual(legacy_percentage(self.frame, color, box),
+                                       engine.percentage(self.frame, color, box))
+        self.assertEqual(len(con_colors) + 1, engine.tables_built)
+        self.assertEqual(2 * (len(con_colors) + 1), engine.direct_queries)
+
+    def test_same_ranges_share_table(self):
+        engine = ColorPercentageEngine(build_after=0, build_area=0)
+        box = Box(100, 100, 50, 50)
+        engine.percentage(self.frame, white_color, box)
+        engine.percentage(self.frame, dict(white_color), box)
+        self.assertEqual(1, engine.tables_built)
+        engine.percentage(self.frame.copy(), white_color, box)
+        self.assertEqual(2, engine.tables_built)
+
+    def test_box_outside_frame(self):
+        engine = ColorPercentageEngine()
+        height, width = self.frame.shape[:2]
+        self.assertIsNone(engine.percentage(self.frame, white_color, Box(width, 0, 10, 10)))
+        box = Box(width - 10, height - 10, 20, 20)
+        self.assertAlmostEqual(legacy_percentage(self.frame, white_color, box),
+                               engine.percentage(self.frame, white_color, box))
+
+    def test_small_boxes_not_built(self):
+        engine = ColorPercentageEngine()
+        for box in random_boxes(self.frame, 20, 3):
+            box.width, box.height = min(box.width, 20), min(box.height, 20)
+            engine.percentage(self.frame, white_color, box)
+        self.assertEqual(0, engine.tables_built)
+
+    def test_hud_region(self):
+        engine = ColorPercentageEngine()
+        # small hud boxes at the same place every frame
+        boxes = [Box(1100 + 40 * i, 700, 30, 30) for i in range(6)]
+        for frame in (self.frame, self.frame.copy()):
+            for box in boxes:
+                self.assertAlmostEqual(legacy_percentage(frame, white_color, box),
+                                       engine.percentage(frame, white_color, box))
+        self.assertEqual(1, engine.tables_built)
+        self.assertEqual(3, engine.table_queries)
+        # the table only covers the hud region
+        self.assertEqual((31, 231), engine.tables[color_key(white_color)][2].shape)
+
+    def test_big_frame_counts(self):
+        engine = ColorPercentageEngine(build_after=0, build_area=0)
+        # bigger than 4K, 255 per pixel would overflow the int32 integral
+        frame = np.full((2304, 4096, 3), 255, dtype=np.uint8)
+        box = Box(0, 0, 4096, 2304)
+        self.assertEqual(1.0, engine.percentage(frame, white_color, box))
+        self.assertEqual(1, engine.table_queries)
+
+    def test_latency(self):
+        # scanning the screen in overlapping tiles, like the echo and dialog searches
+        height, width = self.frame.shape[:2]
+        boxes = [Box(x, y, width // 8, height // 8) for x in range(0, width - width // 8, width // 32)
+                 for y in range(0, height - height // 8, height // 32)]
+        colors = con_colors + [white_color]
+        start = time.time()
+        for color in colors:
+            for box in boxes:
+                legacy_percentage(self.frame, color, box)
+        legacy = time.time() - start
+        engine = ColorPercentageEngine()
+        start = time.time()
+        for color in colors:
+            for box in boxes:
+                engine.percentage(self.frame, color, box)
+        cost = time.time() - start
+        logger.info(f'color percentage of {len(boxes) * len(colors)} boxes legacy {legacy * 1000:.1f}ms '
+                    f'integral {cost * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    unittest.main()
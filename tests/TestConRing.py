@@ -0,0 +1,118 @@
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from ok import Logger
+from src.combat.ConRing import ConRingAnalyzer, con_colors
+
+logger = Logger.get_logger(__name__)
+
+# con box at 1080p, 1500 / 3840 / 2160 of the screen
+min_area = 1500 / 3840 / 2160 * 1920 * 1080
+
+
+def legacy_count_rings(image, color_range, min_area):
+    # the original per label implementation, kept as the reference
+    lower_bound = np.array([color_range['b'][0], color_range['g'][0], color_range['r'][0]], dtype=np.uint8)
+    upper_bound = np.array([color_range['b'][1], color_range['g'][1], color_range['r'][1]], dtype=np.uint8)
+    mask = cv2.inRange(image, lower_bound, upper_bound)
+    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+    def is_full_ring(component_mask):
+        contours, _ = cv2.findContours(component_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if len(contours) != 1:
+            return False
+        contour = contours[0]
+        epsilon = 0.05 * cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, epsilon, True)
+        if not cv2.isContourConvex(approx) or len(approx) < 4:
+            return False
+        return True
+
+    ring_count = 0
+    is_full = False
+    the_area = 0
+    for label in range(1, num_labels):
+        x, y, width, height, area = stats[label, :5]
+        component_mask = (labels == label).astype(np.uint8) * 255
+        contours, _ = cv2.findContours(component_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if width * height >= min_area:
+            if is_full_ring(component_mask):
+                is_full = True
+            the_area = area
+            ring_count += 1
+    if ring_count > 1:
+        is_full = False
+        the_area = 0
+    return the_area, is_full
+
+
+def color_of(index):
+    color = con_colors[index]
+    return tuple(int(sum(color[c]) / 2) for c in 'bgr')
+
+
+def con_image(index, arc=360, noise_seed=None):
+    # the con box at 1080p: a ring of the element color on the dark hud background
+    image = np.full((69, 72, 3), 30, dtype=np.uint8)
+    if noise_seed is not None:
+        rng = np.random.default_rng(noise_seed)
+        image = rng.integers(0, 256, image.shape, dtype=np.uint8)
+        image = cv2.GaussianBlur(image, (5, 5), 0)
+    cv2.ellipse(image, (36, 34), (28, 28), -90, 0, arc, color_of(index), 4)
+    return image
+
+
+class TestConRing(unittest.TestCase):
+
+    def assert_same_as_legacy(self, analyzer, image):
+        rings = analyzer.analyze(image, min_area)
+        for i, color in enumerate(con_colors):
+            expected = legacy_count_rings(image, color, min_area)
+            area, is_full, count = rings.get(i, (0, False, 0))
+            if count > 1:
+                area, is_full = 0, False
+            self.assertEqual(expected, (area, is_full), f'color {i}')
+            single = analyzer.analyze(image, min_area, i).get(i, (0, False, 0))
+            self.assertEqual(rings.get(i, (0, False, 0)), single)
+
+    def test_same_as_legacy(self):
+        analyzer = ConRingAnalyzer()
+        for index in range(len(con_colors)):
+            for arc in (360, 300, 120):
+                self.assert_same_as_legacy(analyzer, con_image(index, arc))
+                self.assert_same_as_legacy(analyzer, con_image(index, arc, noise_seed=index))
+
+    def test_full_ring(self):
+        analyzer = ConRingAnalyzer()
+        for index in range(len(con_colors)):
+            area, is_full, count = analyzer.analyze(con_image(index), min_area)[index]
+            self.assertTrue(is_full)
+            self.assertEqual(1, count)
+            self.assertFalse(analyzer.analyze(con_image(index, 200), min_area)[index][1])
+
+    def test_latency(self):
+        analyzer = ConRingAnalyzer()
+        image = con_image(3, 360, noise_seed=1)
+        start = time.perf_counter()
+        for _ in range(100):
+            for color in con_colors:
+                legacy_count_rings(image, color, min_area)
+        legacy = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        for _ in range(100):
+            analyzer.analyze(image, min_area)
+        all_colors = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        for _ in range(100):
+            analyzer.analyze(image, min_area, 3)
+        steady = (time.perf_counter() - start) / 100
+        logger.info(f'con ring legacy {legacy * 1000:.3f}ms all colors {all_colors * 1000:.3f}ms '
+                    f'one color {steady * 1000:.3f}ms')
+        self.assertLess(all_colors, legacy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import time
+import unittest
+
+import numpy as np
+
+from ok import Logger
+from src.combat.Cooldown import CooldownClassifier
+
+logger = Logger.get_logger(__name__)
+
+
+def legacy_has_cd(stats, frame_width, frame_height, box_width, box_height):
+    # the original per component loop of BaseCombatTask.has_cd, kept as the reference
+    has_dot = False
+    number_count = 0
+    for i in range(1, len(stats)):
+        left, top, width, height, area = stats[i]
+        if left > 0 and top > 0 and left + width < box_width and top + height < box_height:
+            if 16 / 3840 / 2160 <= area / frame_height / frame_width <= 90 / 3840 / 2160 and abs(width - height) / (
+                    width + height) < 0.3 and top / box_height > 0.6:
+                has_dot = True
+            elif 25 / 2160 <= height / frame_height <= 45 / 2160 and 5 / 2160 <= width / frame_height <= 35 / 2160:
+                number_count += 1
+        else:
+            return False
+    return has_dot and 2 <= number_count <= 3
+
+
+def random_stats(rng, box_width, box_height, count):
+    width = rng.integers(1, 25, count)
+    height = rng.integers(1, 25, count)
+    left = rng.integers(0, box_width - width + 1)
+    top = rng.integers(0, box_height - height + 1)
+    area = (width * height * rng.uniform(0.3, 1, count)).astype(np.int32)
+    stats = np.stack([left, top, width, height, area], axis=1).astype(np.int32)
+    return np.vstack([[0, 0, box_width, box_height, box_width * box_height], stats]).astype(np.int32)
+
+
+class TestCooldown(unittest.TestCase):
+
+    def test_same_as_legacy(self):
+        rng = np.random.default_rng(1)
+        classifier = CooldownClassifier()
+        box_width, box_height = 60, 40
+        thresholds = classifier.thresholds_of(1920, 1080, 1080)
+        has_cd_count = 0
+        for _ in range(3000):
+            stats = random_stats(rng, box_width, box_height, rng.integers(0, 5))
+            result = classifier.classify(stats, box_width, box_height, thresholds)
+            self.assertEqual(legacy_has_cd(stats, 1920, 1080, box_width, box_height), result.has_cd)
+            has_cd_count += result.has_cd
+        self.assertGreater(has_cd_count, 0)
+
+    def test_countdown(self):
+        classifier = CooldownClassifier()
+        thresholds = classifier.thresholds_of(1920, 1080, 1080)
+        # two digits and the dot of 2.5 at 1080p
+        stats = np.array([[0, 0, 60, 40, 2400], [10, 10, 8, 15, 60], [30, 10, 8, 15, 60], [22, 28, 3, 3, 9]])
+        result = classifier.classify(stats, 60, 40, thresholds)
+        self.assertEqual((True, 2, 0), tuple(result))
+        self.assertTrue(result.has_cd)
+        stats = np.vstack([stats, [0, 5, 5, 5, 25]])
+        result = classifier.classify(stats, 60, 40, thresholds)
+        self.assertEqual(1, result.invalid)
+        self.assertFalse(result.has_cd)
+
+    def test_thresholds_per_resolution(self):
+        classifier = CooldownClassifier()
+        self.assertIs(classifier.thresholds_of(1920, 1080, 1080), classifier.thresholds_of(1920, 1080, 1080))
+        self.assertEqual(2 * classifier.thresholds_of(1920, 1080, 1080).number_min_height,
+                         classifier.thresholds_of(3840, 2160, 2160).number_min_height)
+
+    def test_latency(self):
+        rng = np.random.default_rng(2)
+        classifier = CooldownClassifier()
+        all_stats = [random_stats(rng, 60, 40, 20) for _ in range(1000)]
+        start = time.time()
+        for stats in all_stats:
+            legacy_has_cd(stats, 1920, 1080, 60, 40)
+        legacy = time.time() - start
+        start = time.time()
+        for stats in all_stats:
+            classifier.classify(stats, 60, 40, classifier.thresholds_of(1920, 1080, 1080))
+        cost = time.time() - start
+        logger.info(f'has_cd of {len(all_stats)} boxes legacy {legacy * 1000:.1f}ms vectorized {cost * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    unittest.main()
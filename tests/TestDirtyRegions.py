@@ -0,0 +1,68 @@
+import time
+import unittest
+
+import cv2
+
+from ok import Box, Logger
+from src.util.DirtyRegions import DirtyRegionTracker
+
+logger = Logger.get_logger(__name__)
+
+
+class TestDirtyRegions(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = cv2.imread('tests/images/in_combat3.png')
+        self.calls = []
+
+    def changed(self, frame, box):
+        frame = frame.copy()
+        frame[box.y + 3, box.x + 5] = 255 - frame[box.y + 3, box.x + 5]
+        return frame
+
+    def predicate(self):
+        self.calls.append(1)
+        return len(self.calls)
+
+    def test_reuse(self):
+        tracker = DirtyRegionTracker()
+        box = Box(1580, 990, 60, 45)
+        self.assertEqual(1, tracker.reuse(self.frame, 'cd', box, self.predicate))
+        self.assertEqual(1, tracker.reuse(self.frame.copy(), 'cd', box, self.predicate))
+        # a single pixel is enough
+        self.assertEqual(2, tracker.reuse(self.changed(self.frame, box), 'cd', box, self.predicate))
+        self.assertEqual(1, tracker.hits)
+        self.assertEqual(2, tracker.misses)
+        # a change outside of the box is ignored
+        self.assertEqual(2, tracker.reuse(self.changed(self.changed(self.frame, box), Box(57, 32, 154, 76)), 'cd',
+                                          box, self.predicate))
+        # another box or a new resolution is computed again
+        self.assertEqual(3, tracker.reuse(self.frame, 'cd', Box(1580, 990, 60, 40), self.predicate))
+        self.assertEqual(4, tracker.reuse(cv2.resize(self.frame, (1280, 720)), 'cd', Box(1000, 600, 60, 40),
+                                          self.predicate))
+
+    def test_moved_pixels(self):
+        tracker = DirtyRegionTracker()
+        box = Box(1580, 990, 60, 45)
+        tracker.reuse(self.frame, 'cd', box, self.predicate)
+        # two pixels swapped keep every channel sum of the box
+        moved = self.frame.copy()
+        moved[[box.y, box.y + 1], box.x] = moved[[box.y + 1, box.y], box.x]
+        self.assertFalse((moved == self.frame).all())
+        self.assertEqual(2, tracker.reuse(moved, 'cd', box, self.predicate))
+
+    def test_latency(self):
+        tracker = DirtyRegionTracker()
+        box = Box(1580, 990, 60, 45)
+        frames = [self.frame.copy() for _ in range(2)] * 500
+        tracker.reuse(self.frame, 'cd', box, self.predicate)
+        start = time.perf_counter()
+        for frame in frames:
+            tracker.reuse(frame, 'cd', box, self.predicate)
+        cost = (time.perf_counter() - start) / len(frames)
+        logger.info(f'unchanged region check {cost * 1e6:.1f}us')
+        self.assertEqual(1, len(self.calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from ok import Logger
+from src.util.GlyphReader import GlyphReader
+
+logger = Logger.get_logger(__name__)
+
+
+def render(text, scale=1.0, offset=(6, 30), background=40):
+    # white text in a fixed font on a dark hud background, like the stamina numbers
+    image = np.full((int(44 * scale), int(220 * scale), 3), background, dtype=np.uint8)
+    cv2.putText(image, text, (int(offset[0] * scale), int(offset[1] * scale)), cv2.FONT_HERSHEY_SIMPLEX,
+                scale, (255, 255, 255), max(1, int(2 * scale)), cv2.LINE_AA)
+    return image
+
+
+class TestGlyphReader(unittest.TestCase):
+
+    def learned_reader(self, resolution=(1080, 1920), scale=1.0):
+        reader = GlyphReader()
+        for text in ('240/240', '1356/789', '57', '123'):
+            self.assertTrue(reader.learn(render(text, scale), text, resolution))
+        return reader
+
+    def test_read_learned(self):
+        reader = self.learned_reader()
+        rng = np.random.default_rng(1)
+        correct = 0
+        values = [f'{rng.integers(0, 241)}/240' for _ in range(50)] + [str(rng.integers(0, 999)) for _ in range(50)]
+        for text in values:
+            found = reader.read(render(text, offset=(int(rng.integers(2, 40)), 30)), (1080, 1920))
+            if found is not None and found[0] == text:
+                correct += 1
+        logger.info(f'glyph reader read {correct}/{len(values)} synthetic numbers')
+        self.assertEqual(len(values), correct)
+
+    def test_unknown(self):
+        reader = GlyphReader()
+        self.assertIsNone(reader.read(render('12'), (1080, 1920)))
+        reader = self.learned_reader()
+        # templates are per resolution
+        self.assertIsNone(reader.read(render('12', 2), (2160, 3840)))
+        # letters were never learned
+        self.assertIsNone(reader.read(render('AB'), (1080, 1920)))
+        self.assertIsNone(reader.read(np.zeros((40, 100, 3), dtype=np.uint8), (1080, 1920)))
+
+    def test_learn_mismatch(self):
+        reader = GlyphReader()
+        self.assertFalse(reader.learn(render('240/240'), '240/24', (1080, 1920)))
+        self.assertFalse(reader.templates)
+
+    def test_verify(self):
+        reader = GlyphReader(verify_every=2)
+        self.assertTrue(reader.verify('12', '1 2'))
+        self.assertFalse(reader.verify('12', '13'))
+        self.assertEqual(0.5, reader.accuracy)
+
+    def test_bright(self):
+        reader = GlyphReader()
+        mask = reader.bright(render('99'))
+        self.assertEqual(np.uint8, mask.dtype)
+        xs = np.nonzero(mask.any(axis=0))[0]
+        # the margin right of '99' stays dark until the number gains a digit
+        margin = slice(xs[-1] + 4, xs[-1] + 4 + mask.shape[0])
+        self.assertFalse(mask[:, margin].any())
+        self.assertTrue(reader.bright(render('990'))[:, margin].any())
+
+    def test_latency(self):
+        reader = self.learned_reader()
+        image = render('238/240')
+        start = time.time()
+        for _ in range(100):
+            reader.read(image, (1080, 1920))
+        cost = (time.time() - start) / 100
+        logger.info(f'glyph read {cost * 1000:.3f}ms')
+        self.assertLess(cost, 0.002)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from src.combat.HudSnapshot import HudSnapshot
+
+
+class TestHudSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.probed = []
+
+    def probe(self, field, *args):
+        self.probed.append((field, *args))
+        if field == 'con_rings':
+            rings = {0: (100, False, 1), 2: (300, True, 1)}
+            return rings if args[0] == -1 else {i: ring for i, ring in rings.items() if i == args[0]}
+        return 0.5 if field in ('percentage', 'forte') else True
+
+    def test_lazy(self):
+        hud = HudSnapshot(None, self.probe)
+        self.assertEqual([], self.probed)
+        self.assertEqual(0.5, hud.echo)
+        self.assertEqual(0.5, hud.percentage('echo'))
+        self.assertTrue(hud.has_cd('echo'))
+        # the other skills, the forte and the con rings are never looked at
+        self.assertEqual([('percentage', 'echo'), ('has_cd', 'echo')], self.probed)
+
+    def test_con_rings(self):
+        hud = HudSnapshot(None, self.probe)
+        self.assertEqual({2: (300, True, 1)}, hud.con_rings_of(2))
+        self.assertEqual({2: (300, True, 1)}, hud.con_rings_of(2))
+        self.assertEqual(2, len(hud.con_rings_of()))
+        # all colors analyzed, one color is read from them
+        self.assertEqual({0: (100, False, 1)}, hud.con_rings_of(0))
+        self.assertEqual([('con_rings', 2), ('con_rings', -1)], self.probed)
+
+
+if __name__ == '__main__':
+    unittest.main()
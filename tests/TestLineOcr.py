@@ -0,0 +1,63 @@
+import time
+import unittest
+
+import cv2
+
+from ok import Logger
+from src.util.LineOcr import LineRecognizer, bright_component_rect
+
+logger = Logger.get_logger(__name__)
+
+# resonance, echo and liberation key hints, as in load_hotkey
+key_boxes = [(0.82, 0.92, 0.85, 0.96), (0.88, 0.92, 0.90, 0.96), (0.93, 0.92, 0.96, 0.96)]
+
+
+def key_crops(frame):
+    height, width = frame.shape[:2]
+    return [frame[int(y * height):int(to_y * height), int(x * width):int(to_x * width)]
+            for x, y, to_x, to_y in key_boxes]
+
+
+class TestLineOcr(unittest.TestCase):
+    recognizer = None
+
+    @classmethod
+    def setUpClass(cls):
+        from rapidocr import RapidOCR
+        cls.recognizer = LineRecognizer(RapidOCR())
+
+    def setUp(self):
+        self.frame = cv2.imread('tests/images/in_combat3.png')
+
+    def key_frames(self):
+        frames = []
+        for crop in key_crops(self.frame):
+            x, y, w, h = bright_component_rect(crop)
+            frames.append(crop[y:y + h, x:x + w])
+        return frames
+
+    def test_hotkeys(self):
+        results = self.recognizer.recognize(self.key_frames())
+        self.assertEqual(['E', 'Q', 'R'], [text for text, _ in results])
+        for _, score in results:
+            self.assertGreater(score, 0.8)
+
+    def test_empty(self):
+        self.assertEqual([], self.recognizer.recognize([]))
+
+    def test_latency(self):
+        frames = self.key_frames()
+        crops = key_crops(self.frame)
+        self.recognizer.recognize(frames)
+        start = time.time()
+        self.recognizer.recognize(frames)
+        batched = time.time() - start
+        start = time.time()
+        for crop in crops:
+            self.recognizer.engine(crop, use_det=True, use_cls=False)
+        detected = time.time() - start
+        logger.info(f'3 hotkeys batched recognition {batched * 1000:.1f}ms, detection + recognition {detected * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
+import os
+import shutil
+import tempfile
 import time
 import unittest
+
+import cv2
+
 from config import config
 from ok.test.TaskTestCase import TaskTestCase
 from src.task.FarmMapTask import FarmMapTask
@@ -17,15 +23,33 @@ class TestTacet(TaskTestCase):
         self.logger.info(f'test_find_treasure_icon {angle, box}')
         self.assertTrue(100 <= angle <= 200)
 
+    def test_arrow_shape_heading(self):
+        # the arrow of mini_map.png heads about 20 degrees, rotate the minimap around it by 110
+        frame = cv2.imread('tests/images/mini_map.png')
+        scene = frame[61:181, 68:188]
+        h, w = scene.shape[:2]
+        scene[:] = cv2.warpAffine(scene, cv2.getRotationMatrix2D((w / 2, h / 2), -110, 1.0), (w, h),
+                                  borderMode=cv2.BORDER_REPLICATE)
+        path = os.path.join(tempfile.mkdtemp(), 'angle_130.png')
+        cv2.imwrite(path, frame)
+        self.set_image(path)
+        angle = self.task.get_my_angle(method='Arrow Shape')
+        template_angle = self.task.get_my_angle(method='Template')
+        shutil.rmtree(os.path.dirname(path))
+        self.logger.info(f'test_arrow_shape_heading {angle} template {template_angle}')
+        self.assertTrue(120 <= angle <= 140)
+        self.assertTrue(abs(angle - template_angle) <= 5)
+
     def test_find_path(self):
         self.set_image('tests/images/path.png')
         self.task.load_stars(wait_world=False)
 
         self.set_image('tests/images/mini_map.png')
         # self.task.my_box = self.task.box_of_screen(0.45, 0.17, 0.62, 0.54)
-        star, distance, angle = self.task.find_direction_angle(screenshot=True)
+        star, distance, angle, located = self.task.find_direction_angle(screenshot=True)
         time.sleep(5)
         self.logger.info(f'test_find_path {star, distance, angle}')
+        self.assertTrue(located)
         self.assertTrue(1 <= distance <= 50)
 
 
@@ -0,0 +1,57 @@
+import time
+import unittest
+
+import cv2
+
+from ok import Logger
+from src.map.MinimapLocator import MinimapLocator, create_circle_mask_with_hole
+
+logger = Logger.get_logger(__name__)
+
+
+class TestMinimapLocator(unittest.TestCase):
+
+    def setUp(self):
+        self.big_map = cv2.imread('tests/images/big_map.png')
+        # a 1080p sized minimap cut from the big map, blurred a bit like the in game minimap
+        self.minimap = cv2.GaussianBlur(self.big_map[400:585, 800:986], (3, 3), 0)
+        self.mask = create_circle_mask_with_hole(self.minimap)
+
+    def test_locate_near_prediction(self):
+        locator = MinimapLocator(self.big_map)
+        x, y, w, h, confidence = locator.locate(self.minimap, self.mask, center=(893 + 20, 492 - 10))
+        self.assertEqual((800, 400), (x, y))
+        self.assertGreater(confidence, 0.9)
+
+    def test_recover_when_lost(self):
+        locator = MinimapLocator(self.big_map)
+        x, y, _, _, _ = locator.locate(self.minimap, self.mask, center=(1500, 900))
+        self.assertEqual((800, 400), (x, y))
+        self.assertGreater(locator.widen_count, 0)
+
+    def test_locate_game_minimap(self):
+        # the real minimap from mini_map.png (box_minimap at 1080p) on the big map of path.png
+        locator = MinimapLocator(cv2.imread('tests/images/path.png'))
+        minimap = cv2.imread('tests/images/mini_map.png')[28:213, 36:222]
+        x, y, _, _, _ = locator.locate(minimap, create_circle_mask_with_hole(minimap), center=(1000, 500))
+        self.assertLessEqual(abs(x - 1117), 2)
+        self.assertLessEqual(abs(y - 378), 2)
+
+    def test_latency(self):
+        locator = MinimapLocator(self.big_map)
+        locator.locate(self.minimap, self.mask, center=(893, 492))
+        start = time.perf_counter()
+        for _ in range(10):
+            locator.locate(self.minimap, self.mask, center=(893, 492))
+        pyramid = (time.perf_counter() - start) / 10
+        # the old search, full scale inside the last match scaled by 1.25
+        start = time.perf_counter()
+        for _ in range(10):
+            cv2.matchTemplate(self.big_map[377:608, 777:1009], self.minimap, cv2.TM_CCOEFF_NORMED, mask=self.mask)
+        full = (time.perf_counter() - start) / 10
+        logger.info(f'minimap locate pyramid {pyramid * 1000:.2f}ms full scale {full * 1000:.2f}ms')
+        self.assertLess(pyramid, full)
+
+
+if __name__ == '__main__':
+    unittest.main()
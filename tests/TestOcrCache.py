@@ -0,0 +1,48 @@
+import time
+import unittest
+
+import cv2
+
+from ok import Logger
+from src.util.OcrCache import OcrCache, roi_hash
+
+logger = Logger.get_logger(__name__)
+
+
+class TestOcrCache(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = cv2.imread('tests/images/in_combat.png')
+
+    def test_roi_hash(self):
+        roi = self.frame[10:100, 20:300]
+        self.assertEqual(roi_hash(roi), roi_hash(roi.copy()))
+        changed = roi.copy()
+        changed[50, 50, 0] ^= 1
+        self.assertNotEqual(roi_hash(roi), roi_hash(changed))
+        # same bytes in another shape
+        self.assertNotEqual(roi_hash(self.frame[0:10, 0:20]), roi_hash(self.frame[0:20, 0:10]))
+
+    def test_lru(self):
+        cache = OcrCache(max_size=2)
+        cache.put('a', ['a'])
+        cache.put('b', ['b'])
+        self.assertEqual(['a'], cache.get('a'))
+        cache.put('c', ['c'])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(['a'], cache.get('a'))
+        self.assertEqual(['c'], cache.get('c'))
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(3, cache.hits)
+        self.assertEqual(2, cache.misses)
+
+    def test_hash_latency(self):
+        roi = self.frame[0:self.frame.shape[0] // 4, 0:self.frame.shape[1] // 4]
+        start = time.time()
+        for _ in range(100):
+            roi_hash(roi)
+        logger.info(f'roi hash of {roi.shape} {(time.time() - start) * 10:.3f}ms')
+
+
+if __name__ == '__main__':
+    unittest.main()
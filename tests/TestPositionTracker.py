@@ -0,0 +1,70 @@
+import unittest
+
+from src.map.PositionTracker import PositionTracker
+
+
+class TestPositionTracker(unittest.TestCase):
+
+    def test_locate_until_velocity_known(self):
+        tracker = PositionTracker(max_uncertainty=10)
+        self.assertTrue(tracker.should_locate(0))
+        tracker.update((100, 100), 0)
+        self.assertTrue(tracker.should_locate(0.1))
+        tracker.update((110, 100), 1)
+        self.assertFalse(tracker.should_locate(1.1))
+        self.assertEqual((115, 100), tracker.predict(1.5))
+
+    def test_uncertainty_grows_with_time(self):
+        tracker = PositionTracker(max_uncertainty=10, drift=0.5)
+        tracker.update((100, 100), 0)
+        tracker.update((120, 100), 1)
+        # error 0 after the second match, drift 10px/s at 20px/s
+        self.assertFalse(tracker.should_locate(1.9))
+        self.assertTrue(tracker.should_locate(2.1))
+
+    def test_straight_walk_skips_matches(self):
+        tracker = PositionTracker(max_uncertainty=10)
+        now = 0
+        position = 0
+        for _ in range(100):
+            now += 0.1
+            position += 3
+            if tracker.should_locate(now):
+                error = tracker.update((position, 0), now)
+                self.assertLess(error, 10)
+            else:
+                tracker.skipped += 1
+                x, y = tracker.predict(now)
+                self.assertAlmostEqual(position, x, delta=10)
+        self.assertGreater(tracker.skip_rate, 0.5)
+
+    def test_heading_turns_prediction(self):
+        tracker = PositionTracker(max_uncertainty=10)
+        tracker.update((0, 0), 0)
+        tracker.update((10, 0), 1)
+        x, y = tracker.predict(2, heading=90)
+        self.assertAlmostEqual(10, x)
+        self.assertAlmostEqual(10, y)
+
+    def test_reset_forces_locate(self):
+        tracker = PositionTracker(max_uncertainty=10)
+        tracker.update((0, 0), 0)
+        tracker.update((10, 0), 1)
+        tracker.reset()
+        self.assertTrue(tracker.should_locate(1))
+
+    def test_hint(self):
+        tracker = PositionTracker(max_uncertainty=10)
+        self.assertIsNone(tracker.hint(0))
+        tracker.reset((50, 50))
+        self.assertEqual((50, 50), tracker.hint(0))
+        tracker.update((0, 0), 0)
+        tracker.update((10, 0), 1)
+        self.assertEqual((15, 0), tracker.hint(1.5))
+        # the motion is dropped, the search still starts where we were last found
+        tracker.reset()
+        self.assertEqual((10, 0), tracker.hint(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from ok import Logger
+from src.util.Profiler import profiled, profiler
+
+logger = Logger.get_logger(__name__)
+
+
+class FakeTask:
+
+    @profiled
+    def in_team(self, cost=0):
+        if cost:
+            time.sleep(cost)
+        return True
+
+    def plain(self, cost=0):
+        return True
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        profiler.reset()
+
+    def tearDown(self):
+        profiler.enabled = False
+        profiler.reset()
+
+    def test_disabled(self):
+        profiler.enabled = False
+        self.assertTrue(FakeTask().in_team())
+        self.assertEqual({}, profiler.report())
+
+    def test_report(self):
+        profiler.enabled = True
+        task = FakeTask()
+        for _ in range(20):
+            task.in_team(0.001)
+        report = profiler.report()['FakeTask.in_team']
+        self.assertEqual(20, report['calls'])
+        self.assertGreaterEqual(report['p50_ms'], 1)
+        self.assertLessEqual(report['p50_ms'], report['p95_ms'])
+        self.assertLessEqual(report['p95_ms'], report['p99_ms'])
+        self.assertGreater(report['calls_per_second'], 0)
+        info = {}
+        profiler.update_info(info)
+        self.assertIn('FakeTask.in_team ms', info)
+        path = profiler.dump(os.path.join(tempfile.mkdtemp(), 'logs', 'profile.json'))
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(20, json.load(f)['FakeTask.in_team']['calls'])
+
+    def test_disabled_overhead(self):
+        profiler.enabled = False
+        task = FakeTask()
+        start = time.perf_counter()
+        for _ in range(100000):
+            task.plain()
+        plain = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(100000):
+            task.in_team()
+        wrapped = time.perf_counter() - start
+        logger.info(f'100000 calls plain {plain * 1000:.1f}ms disabled profiler {wrapped * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+
+from config import config
+from ok.test.TaskTestCase import TaskTestCase
+from src.task.AutoCombatTask import AutoCombatTask
+from src.util.Replay import ReplayCaptureMethod, ReplayHarness, RecordingInteraction
+
+config['debug'] = True
+
+combat_images = ['tests/images/in_combat.png', 'tests/images/in_combat2.png', 'tests/images/in_combat3.png']
+
+
+def write_frames(images, timestamps):
+    path = tempfile.mkdtemp()
+    for image, timestamp in zip(images, timestamps):
+        shutil.copy(image, os.path.join(path, f'{timestamp}.png'))
+    return path
+
+
+class TestReplayCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.path = write_frames(combat_images, [1000, 1100, 1300])
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_step(self):
+        capture = ReplayCaptureMethod(None, self.path, realtime=False)
+        for image in combat_images:
+            self.assertTrue((cv2.imread(image) == capture.do_get_frame()).all())
+            self.assertFalse(capture.finished)
+        # the last frame is kept once finished
+        self.assertTrue((cv2.imread(combat_images[2]) == capture.do_get_frame()).all())
+        self.assertEqual(3, capture.frames_served)
+        self.assertFalse(capture.connected())
+
+    def test_realtime(self):
+        now = [100.0]
+        capture = ReplayCaptureMethod(None, self.path, fps=2, clock=lambda: now[0])
+        self.assertEqual([0, 0.1, 0.3], capture.timestamps)
+        first = capture.do_get_frame()
+        now[0] += 0.05
+        self.assertIs(first, capture.do_get_frame())
+        now[0] += 0.3
+        # the loop was too slow for the second frame, it is skipped
+        self.assertTrue((cv2.imread(combat_images[2]) == capture.do_get_frame()).all())
+        self.assertEqual(3, capture.frames_served)
+        self.assertFalse(capture.finished)
+        # the last frame is shown for 1 / fps
+        now[0] += 0.5
+        capture.do_get_frame()
+        self.assertTrue(capture.finished)
+
+    def test_recording_interaction(self):
+        interaction = RecordingInteraction(None)
+        interaction.send_key('q')
+        interaction.click(0.5, 0.5, name='star')
+        interaction.mouse_down()
+        interaction.mouse_up()
+        interaction.send_key('q')
+        self.assertEqual(['send_key', 'click', 'mouse_down', 'mouse_up', 'send_key'],
+                         [action.name for action in interaction.actions])
+        self.assertEqual({'send_key': 2, 'click': 1, 'mouse_down': 1, 'mouse_up': 1}, interaction.counts())
+
+
+class TestReplayCombatCheck(TaskTestCase):
+    task_class = AutoCombatTask
+    config = config
+
+    def test_replay_in_combat(self):
+        path = write_frames(combat_images, range(len(combat_images)))
+        self.task.do_reset_to_false()
+        harness = ReplayHarness(self.task, path, realtime=False)
+        results = []
+
+        def check_combat():
+            while True:
+                self.task.next_frame()
+                results.append(self.task.in_combat())
+
+        # check_combat never returns, the run ends with the ReplayFinished raised by next_frame
+        report = harness.run(check_combat)
+        shutil.rmtree(path)
+        self.assertTrue(harness.capture.finished)
+        self.logger.info(f'replay in_combat {report.summary()}')
+        self.assertEqual([True, True, True], results)
+        self.assertEqual(3, report.frames)
+        self.assertEqual(3, report.iterations)
+
+
+if __name__ == '__main__':
+    unittest.main()
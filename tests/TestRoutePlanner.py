@@ -0,0 +1,60 @@
+import itertools
+import time
+import unittest
+
+import numpy as np
+
+from ok import Box, Logger
+from src.map.RoutePlanner import distance_matrix, nearest_neighbor, plan_route, route_length
+
+logger = Logger.get_logger(__name__)
+
+
+def random_stars(count, seed, size=1800):
+    rng = np.random.default_rng(seed)
+    return [Box(int(x), int(y), 30, 30) for x, y in rng.uniform(0, size, (count, 2))]
+
+
+class TestRoutePlanner(unittest.TestCase):
+
+    def test_distance_matrix(self):
+        stars = [Box(0, 0, 10, 10), Box(30, 40, 10, 10)]
+        matrix = distance_matrix(stars)
+        self.assertAlmostEqual(50, matrix[0, 1])
+        self.assertAlmostEqual(stars[0].center_distance(stars[1]), matrix[1, 0])
+
+    def test_not_longer_than_greedy(self):
+        start = Box(900, 500, 30, 30)
+        for count in (10, 50, 150):
+            stars = random_stars(count, count)
+            begin = time.perf_counter()
+            path, length, greedy_length = plan_route(stars, start)
+            cost = time.perf_counter() - begin
+            logger.info(f'route {count} stars length {length:.0f} greedy {greedy_length:.0f} in {cost * 1000:.1f}ms')
+            self.assertLessEqual(length, greedy_length)
+            self.assertCountEqual(stars, path)
+
+    def test_close_to_optimal(self):
+        start = Box(0, 0, 30, 30)
+        stars = random_stars(7, 3, size=600)
+        matrix = distance_matrix([start] + stars)
+        best = min(route_length(matrix, (0,) + order) for order in itertools.permutations(range(1, 8)))
+        _, length, _ = plan_route(stars, start)
+        self.assertLessEqual(length, best * 1.05)
+
+    def test_max_distance(self):
+        start = Box(900, 500, 30, 30)
+        stars = random_stars(150, 7)
+        max_distance = 250
+        path, length, greedy_length = plan_route(stars, start, max_distance)
+        matrix = distance_matrix([start] + stars)
+        matrix[matrix > max_distance] = np.inf
+        # the same stars as the nearest neighbor route reaches
+        self.assertEqual(len(nearest_neighbor(matrix)) - 1, len(path))
+        for a, b in zip([start] + path, path):
+            self.assertLessEqual(a.center_distance(b), max_distance)
+        self.assertLessEqual(length, greedy_length)
+
+
+if __name__ == '__main__':
+    unittest.main()
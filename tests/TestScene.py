@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from config import config
+from ok.test.TaskTestCase import TaskTestCase
+from src.scene.WWScene import SceneState, WWScene
+from src.task.AutoCombatTask import AutoCombatTask
+
+config['debug'] = True
+
+
+class TestScene(TaskTestCase):
+    task_class = AutoCombatTask
+    config = config
+
+    def test_probe_once_per_frame(self):
+        scene = WWScene()
+        calls = []
+
+        def probe():
+            calls.append(1)
+            return True
+
+        frame = np.zeros((10, 10, 3), dtype=np.uint8)
+        self.assertTrue(scene.state(frame).get('in_world', probe))
+        self.assertTrue(scene.state(frame).get('in_world', probe))
+        self.assertEqual(1, len(calls))
+        self.assertEqual({'in_world': True}, scene.state(frame).summary())
+        scene.state(frame.copy()).get('in_world', probe)
+        self.assertEqual(2, len(calls))
+        scene.reset()
+        self.assertEqual({}, scene.state(None).summary())
+        self.assertEqual({}, SceneState().summary())
+
+    def test_in_combat_scene(self):
+        self.set_image('tests/images/in_combat3.png')
+        self.assertFalse(self.task.scene_state('black'))
+        self.assertTrue(self.task.scene_state('in_world'))
+        self.assertTrue(self.task.scene_state('in_combat'))
+        self.assertFalse(self.task.scene_state('echo_screen'))
+
+    def test_echo_scene(self):
+        self.set_image('tests/images/echo.png')
+        self.assertFalse(self.task.scene_state('black'))
+
+
+if __name__ == '__main__':
+    unittest.main()
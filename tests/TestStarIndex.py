@@ -0,0 +1,60 @@
+import time
+import unittest
+
+import numpy as np
+
+from ok import Box, Logger
+from src.map.StarIndex import StarIndex
+
+logger = Logger.get_logger(__name__)
+
+
+def random_stars(count, seed, size=1800):
+    rng = np.random.default_rng(seed)
+    return [Box(int(x), int(y), 30, 30) for x, y in rng.uniform(0, size, (count, 2))]
+
+
+def brute_nearest(stars, box):
+    return min(stars, key=lambda star: star.center_distance(box))
+
+
+class TestStarIndex(unittest.TestCase):
+
+    def test_nearest_same_as_brute_force(self):
+        stars = random_stars(200, 1)
+        index = StarIndex(stars, 54)
+        for query in random_stars(100, 2, size=2200):
+            _, distance = index.nearest(query)
+            expected = brute_nearest(stars, query)
+            self.assertAlmostEqual(expected.center_distance(query), distance)
+
+    def test_remove(self):
+        stars = random_stars(100, 3)
+        index = StarIndex(stars, 54)
+        query = Box(900, 500, 30, 30)
+        while stars:
+            nearest, _ = index.nearest(query)
+            self.assertIs(brute_nearest(stars, query), nearest)
+            self.assertTrue(index.remove(nearest))
+            stars.remove(nearest)
+            self.assertEqual(len(stars), len(index))
+        self.assertEqual((None, float('inf')), index.nearest(query))
+        self.assertFalse(index.remove(query))
+
+    def test_query_cost_flat(self):
+        queries = random_stars(200, 4)
+        costs = []
+        for count in (100, 1000):
+            # same density, a bigger map with more stars
+            size = int(1800 * (count / 100) ** 0.5)
+            index = StarIndex(random_stars(count, 5, size=size), 54)
+            start = time.perf_counter()
+            for query in queries:
+                index.nearest(query)
+            costs.append((time.perf_counter() - start) / len(queries))
+        logger.info(f'star index nearest 100 stars {costs[0] * 1e6:.1f}us 1000 stars {costs[1] * 1e6:.1f}us')
+        self.assertLess(costs[1], costs[0] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from ok import Logger
+from src.OpenVinoYolo8Detect import OpenVinoYolo8Detect
+
+logger = Logger.get_logger(__name__)
+
+weights = os.path.join('assets', 'yolo', 'echo.onnx')
+
+
+def legacy_postprocess(detector, outputs, padding, orig_shape, confidence_threshold, label):
+    # the original per-row loop, kept here as the reference for the vectorized decode
+    outputs = np.transpose(np.squeeze(outputs[0])).copy()
+    boxes = []
+    scores = []
+    class_ids = []
+    gain = min(orig_shape[0] / orig_shape[0], detector.input_width / orig_shape[1])
+    outputs[:, 0] -= padding[1]
+    outputs[:, 1] -= padding[0]
+    for i in range(outputs.shape[0]):
+        classes_scores = outputs[i][4:]
+        max_score = np.amax(classes_scores)
+        class_id = np.argmax(classes_scores)
+        if max_score >= confidence_threshold and (label == -1 or label == class_id):
+            x, y, w, h = outputs[i][0], outputs[i][1], outputs[i][2], outputs[i][3]
+            class_ids.append(class_id)
+            scores.append(max_score)
+            boxes.append([int((x - w / 2) / gain), int((y - h / 2) / gain), int(w / gain), int(h / gain)])
+    indices = cv2.dnn.NMSBoxes(boxes, scores, confidence_threshold, detector.iou_threshold)
+    return [(boxes[i], class_ids[i], float(scores[i])) for i in indices]
+
+
+def to_tuples(boxes):
+    return [([box.x, box.y, box.width, box.height], box.name, float(box.confidence)) for box in boxes]
+
+
+def bench(fun, count=100):
+    start = time.perf_counter()
+    for _ in range(count):
+        fun()
+    return (time.perf_counter() - start) / count * 1000
+
+
+class TestYolo(unittest.TestCase):
+
+    def postprocess_only_detector(self):
+        detector = OpenVinoYolo8Detect.__new__(OpenVinoYolo8Detect)
+        detector.dic_labels = {0: 'echo'}
+        detector.iou_threshold = 0.45
+        detector.input_width = 640
+        detector.input_height = 640
+        return detector
+
+    def assert_same_as_legacy(self, detector, outputs, pad, shape, threshold, label):
+        expected = legacy_postprocess(detector, outputs, pad, shape, threshold, label)
+        actual = to_tuples(detector._postprocess(outputs, pad, shape, threshold, label))
+        self.assertEqual(len(expected), len(actual))
+        for (e_box, e_class, e_score), (a_box, a_name, a_score) in zip(expected, actual):
+            self.assertEqual(e_box, a_box)
+            self.assertEqual(detector.dic_labels.get(int(e_class), 'unknown'), a_name)
+            self.assertAlmostEqual(e_score, a_score, places=6)
+        legacy_ms = bench(lambda: legacy_postprocess(detector, outputs, pad, shape, threshold, label))
+        vectorized_ms = bench(lambda: detector._postprocess(outputs, pad, shape, threshold, label))
+        logger.info(f'postprocess {len(actual)} boxes legacy {legacy_ms:.3f}ms vectorized {vectorized_ms:.3f}ms')
+
+    def test_postprocess_synthetic(self):
+        detector = self.postprocess_only_detector()
+        rng = np.random.default_rng(0)
+        outputs = np.zeros((1, 5, 8400), dtype=np.float32)
+        outputs[0, 0] = rng.uniform(0, 640, 8400)
+        outputs[0, 1] = rng.uniform(140, 500, 8400)
+        outputs[0, 2] = rng.uniform(5, 80, 8400)
+        outputs[0, 3] = rng.uniform(5, 80, 8400)
+        outputs[0, 4] = rng.uniform(0, 1, 8400) ** 8
+        for threshold in (0.3, 0.6, 0.9):
+            self.assert_same_as_legacy(detector, outputs, (140, 0), (1080, 1920), threshold, 0)
+            self.assert_same_as_legacy(detector, outputs, (140, 0), (1080, 1920), threshold, -1)
+
+    def test_postprocess_echo_images(self):
+        if not os.path.exists(weights):
+            self.skipTest(f'{weights} not found')
+        detector = OpenVinoYolo8Detect(weights=weights)
+        for image_path in ('tests/images/echo.png', 'tests/images/echo2.png'):
+            image = cv2.imread(image_path)
+            h, w = image.shape[:2]
+            img_data, pad = detector._preprocess(image)
+            outputs = detector.compiled_model({detector.input_layer: img_data})[detector.output_layer]
+            self.assert_same_as_legacy(detector, outputs, pad, (h, w), 0.6, 0)
+            self.assertEqual(1, len(detector.detect(image, threshold=0.6, label=0)))
+
+
+if __name__ == '__main__':
+    unittest.main()